@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 13:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0002_user_quote'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quote',
+            name='user',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='message', to='myApp.user'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['user', 'id'], name='quote_user_id_idx'),
+        ),
+    ]
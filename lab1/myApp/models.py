@@ -8,4 +8,10 @@ class User(models.Model):
 
 class Quote(models.Model):
     message = models.TextField()
-    user = models.ForeignKey(User, related_name="message", on_delete=models.SET_NULL, null=True)
+    user = models.ForeignKey(User, related_name="message", on_delete=models.SET_NULL, null=True, db_index=False)
+
+    class Meta:
+        indexes = [
+            # users/{pk}/quotes/ filtrira po korisniku i stranici po id-u, indeks pokriva oboje
+            models.Index(fields=['user', 'id'], name='quote_user_id_idx'),
+        ]
@@ -0,0 +1,9 @@
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    # WHERE id > <cursor> ORDER BY id LIMIT n, svaka stranica jednako brza
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
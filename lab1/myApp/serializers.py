@@ -11,7 +11,14 @@ class QuoteSerializer(serializers.ModelSerializer):
 
 class UserSerializer(serializers.ModelSerializer):
     #quote = QuoteSerializer(read_only=True, many=True)
+    quote_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = "__all__"
+
+    def get_quote_count(self, user):
+        # lista dolazi s anotacijom, a npr. tek stvoreni korisnik nema je pa se broji posebnim upitom
+        if hasattr(user, 'quote_count'):
+            return user.quote_count
+        return user.message.count()
@@ -1,3 +1,101 @@
-from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
 
-# Create your tests here.
+from .models import User, Quote
+
+
+class QueryCountMixin:
+    """
+    Checks that an endpoint runs the same number of SQL queries no matter how many rows it returns.
+    """
+
+    def make_rows(self, count):
+        raise NotImplementedError
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url, num, sizes=(1, 10, 50)):
+        for size in sizes:
+            self.make_rows(size)
+            self.assertEqual(self.count_queries(url), num,
+                             "{} ran a different number of queries for {} rows".format(url, size))
+
+
+class QuoteQueryCountTest(QueryCountMixin, APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(name='Test', email='test@tests.dev')
+
+    def make_rows(self, count):
+        users = [User.objects.create(name='Test', email='test@tests.dev') for _ in range(count)]
+        Quote.objects.bulk_create([Quote(message='Test message', user=user) for user in users])
+        Quote.objects.bulk_create([Quote(message='Test message', user=self.user) for _ in range(count)])
+
+    def test_list_Quotes(self):
+        self.assertConstantQueries('/api/quotes/', 1)
+
+    def test_list_User_Quotes(self):
+        self.assertConstantQueries('/api/users/{}/quotes/'.format(self.user.pk), 1)
+
+
+class UserQuoteCountTest(QueryCountMixin, APITestCase):
+    def make_rows(self, count):
+        user = User.objects.create(name='Test', email='test@tests.dev')
+        Quote.objects.bulk_create([Quote(message='Test message', user=user) for _ in range(count)])
+
+    def test_list_Users_query_count(self):
+        self.assertConstantQueries('/api/users/', 1)
+
+    def test_list_Users_ordered_by_quote_count(self):
+        for count in (2, 5, 0):
+            self.make_rows(count)
+        response = self.client.get('/api/users/?ordering=-quote_count', format='json')
+        self.assertEqual([user['quote_count'] for user in response.json()], [5, 2, 0])
+
+    def test_create_User_quote_count(self):
+        response = self.client.post('/api/users/', {'name': 'Test', 'email': 'test@tests.dev'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['quote_count'], 0)
+
+
+class UserQuoteTest(APITestCase):
+    def setUp(self) -> None:
+        self.user = User.objects.create(name='Test', email='test@tests.dev')
+        self.other = User.objects.create(name='Other', email='other@tests.dev')
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), user=self.user) for i in range(5)])
+        Quote.objects.bulk_create([Quote(message='Other message', user=self.other) for _ in range(3)])
+
+    def test_list_only_User_Quotes(self):
+        url = '/api/users/{}/quotes/?page_size=2'.format(self.user.pk)
+        ids = []
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(all(quote['user']['id'] == self.user.pk for quote in response.json()['results']))
+            ids.extend(quote['id'] for quote in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(ids, list(Quote.objects.filter(user=self.user).order_by('id').values_list('id', flat=True)))
+
+    def test_single_Quote_of_other_User(self):
+        quote = Quote.objects.filter(user=self.other).first()
+        response = self.client.get('/api/users/{}/quotes/{}/'.format(self.user.pk, quote.pk), format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_User_Quote(self):
+        response = self.client.post('/api/users/{}/quotes/'.format(self.other.pk), {'message': 'New'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['user']['id'], self.other.pk)
+        missing = self.client.post('/api/users/999/quotes/', {'message': 'New'}, format='json')
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_User_Quotes_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + str(Quote.objects.filter(user_id=1).order_by('id').query))
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('quote_user_id_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
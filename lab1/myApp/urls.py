@@ -1,13 +1,13 @@
 from django.conf.urls import url, include
 from rest_framework_nested.routers import DefaultRouter, NestedSimpleRouter
-from .views import UserAPI, QuoteAPI
+from .views import UserAPI, QuoteAPI, UserQuoteAPI
 
 router = DefaultRouter()
 router.register(r'quotes', QuoteAPI)
 router.register(r'users', UserAPI)
 
 users_router = NestedSimpleRouter(router, r'users', lookup='user')
-users_router.register(r'quotes', QuoteAPI, basename='user-quotes')  # TODO: dodati drugi view s filtracijom
+users_router.register(r'quotes', UserQuoteAPI, basename='user-quotes')
 
 
 urlpatterns = [
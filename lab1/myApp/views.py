@@ -1,16 +1,31 @@
+from django.db.models import Count
 from .models import User, Quote
 from .serializers import UserSerializer, QuoteSerializer
-from rest_framework import viewsets
+from django.shortcuts import get_object_or_404
+from rest_framework import filters, viewsets
+from .pagination import IdCursorPagination
 
 
 class UserAPI(viewsets.ModelViewSet):
-    queryset = User.objects.all()
+    queryset = User.objects.annotate(quote_count=Count('message'))   # broj citata u istom upitu
     serializer_class = UserSerializer
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['id', 'name', 'email', 'quote_count']
+    ordering = ['id']
 
 
 class QuoteAPI(viewsets.ModelViewSet):
-    queryset = Quote.objects.all()
+    queryset = Quote.objects.select_related('user')   # depth=1 serializer, autora dohvaca isti upit
     serializer_class = QuoteSerializer
 
 
-# TODO: dodati novi view s filtracijom po foreign key
\ No newline at end of file
+class UserQuoteAPI(viewsets.ModelViewSet):
+    serializer_class = QuoteSerializer
+    pagination_class = IdCursorPagination
+
+    def get_queryset(self):
+        # samo citati korisnika iz URL-a, autor se dohvaca u istom upitu
+        return Quote.objects.filter(user_id=self.kwargs['user_pk']).select_related('user')
+
+    def perform_create(self, serializer):
+        serializer.save(user=get_object_or_404(User, pk=self.kwargs['user_pk']))
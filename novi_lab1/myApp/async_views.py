@@ -0,0 +1,103 @@
+"""
+Async read-only views for authors and quotes, meant to be served through `novi_lab1.asgi`.
+
+Django 3.2 has no async ORM interface yet, so each request makes exactly one `sync_to_async` hop that
+authenticates and throttles the caller and fetches the page of rows. Serialization and rendering then run on the
+event loop; the serializers only touch already loaded columns, so they never reach the database.
+The responses match the ones from `AuthorAPI` and `QuoteAPI`.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotAuthenticated, NotFound, PermissionDenied, Throttled
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Author, Quote
+from .serializers import AuthorSerializer, QuoteSerializer
+
+
+def check_throttles(drf_request):
+    """
+    Same as `APIView.check_throttles`: every configured throttle counts the request and the longest wait wins.
+    """
+    waits = []
+    for throttle in [throttle_class() for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES]:
+        if not throttle.allow_request(drf_request, None):
+            waits.append(throttle.wait())
+    if waits:
+        raise Throttled(max([wait for wait in waits if wait is not None], default=None))
+
+
+def authenticate(request):
+    """
+    Runs the configured DRF authenticators, permission classes and throttles against `request`.
+    """
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    for permission in api_settings.DEFAULT_PERMISSION_CLASSES:
+        if not permission().has_permission(drf_request, None):
+            if drf_request.successful_authenticator is not None:
+                raise PermissionDenied()
+            exc = NotAuthenticated()
+            # same as APIView: without a WWW-Authenticate challenge the answer is 403, not 401
+            if not drf_request.authenticators[0].authenticate_header(drf_request):
+                exc.status_code = status.HTTP_403_FORBIDDEN
+            raise exc
+    check_throttles(drf_request)
+    return drf_request
+
+
+def fetch_page(request, queryset):
+    drf_request = authenticate(request)
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    rows = paginator.paginate_queryset(queryset, drf_request)
+    return rows, paginator.get_next_link(), paginator.get_previous_link()
+
+
+def fetch_object(request, queryset, pk):
+    authenticate(request)
+    try:
+        return queryset.get(pk=pk)
+    except queryset.model.DoesNotExist:
+        raise NotFound()
+
+
+def error_response(exc):
+    response = JsonResponse({'detail': exc.detail}, status=exc.status_code, encoder=JSONEncoder)
+    if getattr(exc, 'wait', None):
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+async def list_view(request, queryset, serializer_class):
+    try:
+        rows, next_link, previous_link = await sync_to_async(fetch_page)(request, queryset)
+    except APIException as exc:
+        return error_response(exc)
+    data = {'next': next_link, 'previous': previous_link, 'results': serializer_class(rows, many=True).data}
+    return JsonResponse(data, encoder=JSONEncoder)
+
+
+async def detail_view(request, queryset, serializer_class, pk):
+    try:
+        instance = await sync_to_async(fetch_object)(request, queryset, pk)
+    except APIException as exc:
+        return error_response(exc)
+    return JsonResponse(serializer_class(instance).data, encoder=JSONEncoder)
+
+
+async def author_list(request):
+    return await list_view(request, Author.objects.with_quote_count(), AuthorSerializer)
+
+
+async def author_detail(request, pk):
+    return await detail_view(request, Author.objects.with_quote_count(), AuthorSerializer, pk)
+
+
+async def quote_list(request):
+    return await list_view(request, Quote.objects.all(), QuoteSerializer)
+
+
+async def quote_detail(request, pk):
+    return await detail_view(request, Quote.objects.all(), QuoteSerializer, pk)
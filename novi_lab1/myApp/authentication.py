@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    In-process LRU map of verified token keys to `(user, token)`, with entries expiring after
+    `TOKEN_CACHE_TTL` seconds so that revocations made by other processes are picked up.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            credentials, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return credentials
+
+    def set(self, key, credentials):
+        expires_at = time.monotonic() + getattr(settings, 'TOKEN_CACHE_TTL', 300)
+        with self._lock:
+            self._entries[key] = (credentials, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000):
+                self._entries.popitem(last=False)
+
+    def revoke(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def revoke_user(self, user_id):
+        with self._lock:
+            for key in [key for key, ((user, _), _) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers verified tokens in `token_cache`, so a returning client costs
+    one dictionary lookup instead of a database query. Deleting a token or saving its user evicts it.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = token_cache.get(key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            token_cache.set(key, credentials)
+        return credentials
@@ -0,0 +1,251 @@
+"""
+Latency and queries-per-request benchmarks for every route in `myApp.urls`, used by `manage.py benchmark_api`.
+
+Requests go through the whole Django stack in-process with the test client, so the numbers exclude the
+network and the web server. The response cache and the rate limits are disabled while measuring.
+"""
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+from .middleware import QueryTimer
+from . import renderers
+from .models import Author, Quote
+from .seeding import WORDS, message_lengths
+from .serializers import QuoteSerializer
+from .throttling import SlidingWindowThrottle
+
+# name: (quotes, authors)
+DATASETS = {
+    '1k': (1000, 20),
+    '100k': (100000, 500),
+    '1m': (1000000, 5000),
+}
+
+
+@contextmanager
+def benchmark_environment():
+    """
+    Turns off the response cache and the rate limits, which would otherwise measure the cache or reject
+    the benchmark's requests, and ends change streams after their first lookup.
+    """
+    caches = {**settings.CACHES, 'benchmark': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    unlimited = {scope: None for scope in SlidingWindowThrottle.THROTTLE_RATES}
+    with override_settings(CACHES=caches, RESPONSE_CACHE_ALIAS='benchmark', CHANGE_STREAM_TIMEOUT=0), \
+            mock.patch.dict(SlidingWindowThrottle.THROTTLE_RATES, unlimited):
+        yield
+
+
+class Route(namedtuple('Route', 'label name method kwargs params body ids')):
+    """
+    One benchmarked request. `kwargs` values name the kind of row to pick for each URL argument
+    (`author`, `quote` or `author_quote`); a new row is picked at random for every request. With `ids`,
+    `batch_size` random ids of that kind are sent in the `ids` query parameter. `body` names the JSON
+    document sent with writes: an `author`, a `quote` or a list of `bulk_size` `quotes`.
+    """
+
+    def __new__(cls, name, label=None, method='get', kwargs=None, params=None, body=None, ids=None):
+        return super().__new__(cls, label or name, name, method, kwargs or {}, params or {}, body, ids)
+
+
+ROUTES = [
+    Route('api-root'),
+    Route('author-list', params={'page_size': 100}),
+    Route('author-list', label='author-list?ordering', params={'page_size': 100, 'ordering': '-quote_count'}),
+    Route('author-list', label='author-list POST', method='post', body='author'),
+    Route('author-detail', kwargs={'pk': 'author'}),
+    Route('author-detail', label='author-detail PUT', method='put', kwargs={'pk': 'author'}, body='author'),
+    Route('author-detail', label='author-detail PATCH', method='patch', kwargs={'pk': 'author'}, body='author'),
+    Route('author-detail', label='author-detail DELETE', method='delete', kwargs={'pk': 'author'}),
+    Route('author-export'),
+    Route('author-batch', ids='author'),
+    Route('author-quotes-list', kwargs={'author_pk': 'author'}, params={'page_size': 100}),
+    Route('author-quotes-list', label='author-quotes-list POST', method='post', kwargs={'author_pk': 'author'},
+          body='quote'),
+    Route('author-quotes-detail', kwargs={'author_pk': 'author', 'pk': 'author_quote'}),
+    Route('author-quotes-detail', label='author-quotes-detail PUT', method='put',
+          kwargs={'author_pk': 'author', 'pk': 'author_quote'}, body='quote'),
+    Route('author-quotes-detail', label='author-quotes-detail PATCH', method='patch',
+          kwargs={'author_pk': 'author', 'pk': 'author_quote'}, body='quote'),
+    Route('author-quotes-detail', label='author-quotes-detail DELETE', method='delete',
+          kwargs={'author_pk': 'author', 'pk': 'author_quote'}),
+    Route('quote-list', params={'page_size': 100}),
+    Route('quote-list', label='quote-list?expand', params={'page_size': 100, 'expand': 'author'}),
+    Route('quote-list', label='quote-list?search', params={'search': 'truth wisdom'}),
+    Route('quote-list', label='quote-list POST', method='post', body='quote'),
+    Route('quote-detail', kwargs={'pk': 'quote'}),
+    Route('quote-detail', label='quote-detail PUT', method='put', kwargs={'pk': 'quote'}, body='quote'),
+    Route('quote-detail', label='quote-detail PATCH', method='patch', kwargs={'pk': 'quote'}, body='quote'),
+    Route('quote-detail', label='quote-detail DELETE', method='delete', kwargs={'pk': 'quote'}),
+    Route('quote-random'),
+    Route('quote-batch', ids='quote'),
+    Route('quote-export', params={'id__lt': 1001}),
+    Route('quote-bulk', method='post', body='quotes'),
+    Route('change-list', params={'since': 0, 'page_size': 100}),
+    Route('change-stream', params={'since': 0}),
+    Route('async-author-list', params={'page_size': 100}),
+    Route('async-author-detail', kwargs={'pk': 'author'}),
+    Route('async-quote-list', params={'page_size': 100}),
+    Route('async-quote-detail', kwargs={'pk': 'quote'}),
+]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class BenchmarkSuite:
+    """
+    Runs `ROUTES` against the rows currently in the database and returns, per route, the latency
+    percentiles in milliseconds and the highest number of SQL queries a single request ran.
+    """
+    bulk_size = 100
+    batch_size = 50
+
+    def __init__(self, requests=50, warmup=3, seed=0):
+        self.requests = requests
+        self.warmup = warmup
+        self.rng = random.Random(seed)
+
+    def pick(self, kind, picked):
+        if kind == 'author':
+            return self.rng.choice(self.author_ids)
+        if kind == 'quote':
+            return self.rng.choice(self.quote_ids)
+        quote = Quote.objects.filter(author=picked['author_pk']).values_list('pk', flat=True).first()
+        return quote if quote is not None else 0
+
+    def payload(self, kind, picked):
+        if kind == 'author':
+            return {'name': uuid.uuid4().hex, 'surname': uuid.uuid4().hex}
+        # nested quote routes keep the quote with the author in the URL
+        author = picked.get('author_pk') or self.rng.choice(self.author_ids)
+        if kind == 'quote':
+            return {'message': uuid.uuid4().hex, 'author': author}
+        return [{'message': uuid.uuid4().hex, 'author': author} for _ in range(self.bulk_size)]
+
+    def prepare(self, route):
+        """
+        Returns the test client method and arguments for one request to `route`.
+        """
+        picked = {}
+        for argument, kind in route.kwargs.items():
+            picked[argument] = self.pick(kind, picked)
+        path = reverse(route.name, kwargs=picked)
+        if route.body:
+            body = json.dumps(self.payload(route.body, picked))
+            return 'generic', (route.method.upper(), path, body), {'content_type': 'application/json'}
+        if route.method != 'get':
+            return route.method, (path,), {}
+        params = dict(route.params)
+        if route.ids:
+            ids = self.author_ids if route.ids == 'author' else self.quote_ids
+            params['ids'] = ','.join(map(str, self.rng.sample(ids, min(self.batch_size, len(ids)))))
+        return route.method, (path, params), {}
+
+    def measure(self, client, route):
+        latencies, queries = [], 0
+        for index in range(self.warmup + self.requests):
+            method, args, kwargs = self.prepare(route)
+            timer = QueryTimer()
+            # writes are rolled back so every request sees the same data
+            with transaction.atomic():
+                with connection.execute_wrapper(timer):
+                    started = time.perf_counter()
+                    response = getattr(client, method)(*args, **kwargs)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if response.status_code >= 400:
+                raise RuntimeError('{} answered {}'.format(route.label, response.status_code))
+            if index >= self.warmup:
+                latencies.append(elapsed * 1000)
+                queries = max(queries, timer.count)
+        return {
+            'p50': round(statistics.median(latencies), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'p99': round(percentile(latencies, 0.99), 3),
+            'queries': queries,
+        }
+
+    def run(self, routes=ROUTES):
+        self.author_ids = list(Author.objects.values_list('pk', flat=True))
+        self.quote_ids = list(Quote.objects.values_list('pk', flat=True))
+        if not self.author_ids or not self.quote_ids:
+            raise RuntimeError('The benchmark needs authors and quotes in the database.')
+
+        user = User.objects.create_user('benchmark-{}'.format(uuid.uuid4().hex))
+        client = Client(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=user).key)
+        try:
+            with benchmark_environment():
+                return {route.label: self.measure(client, route) for route in routes}
+        finally:
+            user.delete()
+
+
+def compare(results, baseline, max_slowdown=2.0, slack_ms=2.0):
+    """
+    Returns the regressions of `results` against `baseline`: a route whose p95 latency grew by more than
+    `max_slowdown` times (plus `slack_ms`, so sub-millisecond noise doesn't count) or that runs more
+    queries per request than before.
+    """
+    regressions = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        if result['p95'] > before['p95'] * max_slowdown + slack_ms:
+            regressions.append('{}: p95 {:.2f} ms, baseline {:.2f} ms'.format(label, result['p95'], before['p95']))
+        if result['queries'] > before['queries']:
+            regressions.append('{}: {} queries per request, baseline {}'.format(
+                label, result['queries'], before['queries']))
+    return regressions
+
+
+def sample_quotes(count, seed=0):
+    """
+    Serialized quotes like `/api/quotes/` returns them, built in memory without touching the database.
+    """
+    rng = random.Random(seed)
+    lengths = message_lengths(rng, 12, 0.5)
+    now = timezone.now()
+    quotes = [Quote(id=pk, message=' '.join(rng.choices(WORDS, k=next(lengths))), author_id=rng.randint(1, 100),
+                    updated_at=now) for pk in range(1, count + 1)]
+    return {'next': None, 'previous': None, 'results': QuoteSerializer(quotes, many=True).data}
+
+
+def compare_renderers(data, repeat=20):
+    """
+    Renders `data` with every available renderer and returns `(name, bytes, milliseconds per render)` rows.
+    """
+    candidates = [('json (stdlib)', JSONRenderer())]
+    if renderers.orjson is not None:
+        candidates.append(('json (orjson)', renderers.FastJSONRenderer()))
+    if renderers.msgpack is not None:
+        candidates.append(('msgpack', renderers.MessagePackRenderer()))
+
+    rows = []
+    for name, renderer in candidates:
+        body = renderer.render(data, renderer.media_type, {})
+        started = time.perf_counter()
+        for _ in range(repeat):
+            renderer.render(data, renderer.media_type, {})
+        rows.append((name, len(body), (time.perf_counter() - started) * 1000 / repeat))
+    return rows
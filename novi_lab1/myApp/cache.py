@@ -0,0 +1,121 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+
+class ResponseCache:
+    """
+    Serialized API responses stored in the `RESPONSE_CACHE_ALIAS` cache (local-memory LRU by default;
+    any Django cache backend, such as a Redis one, can be configured instead).
+
+    Every entry depends on one or more namespaces, such as `quotes` or `author:5:quotes`, and its key
+    embeds the current generation of each of them. Invalidating a namespace bumps its generation, which
+    orphans all entries built on it; they are never read again and age out of the cache.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+    def generations(self, namespaces):
+        keys = ['generation:' + namespace for namespace in namespaces]
+        generations = self.cache.get_many(keys)
+        for key in keys:
+            if key not in generations:
+                generations[key] = time.time_ns()
+                self.cache.add(key, generations[key], timeout=None)
+        return [generations[key] for key in keys]
+
+    def key(self, namespaces, scope, request):
+        query = sorted(request.query_params.lists())
+        media_type = getattr(request, 'accepted_media_type', '')
+        # cached pages hold absolute next/previous links
+        origin = (request.scheme, request.get_host())
+        digest = hashlib.md5(repr((origin, request.path, query, media_type, self.generations(namespaces))).encode())
+        return 'response:{}:{}'.format(scope, digest.hexdigest())
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, response):
+        headers = {header: response[header] for header in ('ETag', 'Last-Modified', 'Vary')
+                   if response.has_header(header)}
+        self.cache.set(key, (response.data, headers), timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+    def bump(self, namespaces):
+        for namespace in namespaces:
+            try:
+                self.cache.incr('generation:' + namespace)
+            except ValueError:
+                self.cache.set('generation:' + namespace, time.time_ns(), timeout=None)
+
+    def invalidate(self, *namespaces):
+        """
+        Bumps `namespaces` now and again once the current transaction commits, so a request that read
+        the old rows in between cannot leave a stale entry behind.
+        """
+        self.bump(namespaces)
+        transaction.on_commit(lambda: self.bump(namespaces))
+
+    def clear(self):
+        self.cache.clear()
+
+
+response_cache = ResponseCache()
+
+
+class CachedResponseMixin:
+    """
+    Serves `list` and `retrieve` from `response_cache`. Views name the namespaces a response depends on
+    in `get_cache_namespaces`; model signals invalidate those namespaces on every write. Responses that
+    embed related objects with `?expand=` also depend on the namespaces listed for them in `expand_namespaces`.
+    """
+    expand_namespaces = {}
+
+    def get_cache_namespaces(self):
+        raise NotImplementedError
+
+    def get_expand_namespaces(self):
+        names = [name.strip() for name in self.request.query_params.get('expand', '').split(',')]
+        return [self.expand_namespaces[name] for name in names if name in self.expand_namespaces]
+
+    def get_cache_pk(self, kwarg):
+        value = self.kwargs[kwarg]
+        return str(int(value)) if value.isdigit() else value
+
+    def get_cache_scope(self):
+        user = self.request.user
+        return 'staff' if user.is_staff else 'user'
+
+    def cached(self, handler, request, *args, **kwargs):
+        namespaces = self.get_cache_namespaces() + self.get_expand_namespaces()
+        key = response_cache.key(namespaces, self.get_cache_scope(), request)
+        entry = response_cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                response_cache.set(key, response)
+                response.keep_compressed = True
+            return response
+
+        data, headers = entry
+        last_modified = parse_http_date_safe(headers.get('Last-Modified', ''))
+        response = get_conditional_response(request, etag=headers.get('ETag'), last_modified=last_modified)
+        if response is None:
+            response = Response(data)
+        for header, value in headers.items():
+            response[header] = value
+        response.keep_compressed = True
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/x-ndjson',
+                      'application/xml', 'application/yaml', 'application/msgpack', 'application/openapi',
+                      'image/svg+xml')
+
+
+def available_encoders():
+    """
+    Content codings this process can produce, in order of preference.
+    """
+    encoders = {}
+    if brotli is not None:
+        encoders['br'] = lambda body: brotli.compress(body, quality=5)
+    if zstandard is not None:
+        encoders['zstd'] = lambda body: zstandard.ZstdCompressor(level=6).compress(body)
+    encoders['gzip'] = lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+    return encoders
+
+
+def choose_encoding(accept_encoding, available):
+    """
+    Picks the coding from `available` (in preference order) the client weighs highest in `Accept-Encoding`,
+    or None when it accepts none of them.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding:
+            weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def is_compressible(content_type):
+    media_type = content_type.split(';')[0].strip().lower()
+    # server-sent events must reach the client event by event, a compressor would hold them back
+    return media_type.startswith(COMPRESSIBLE_TYPES) and media_type != 'text/event-stream'
+
+
+def keeps_compressed(response):
+    """
+    Whether `response` is likely to be sent again byte for byte: it carries an ETag or was marked by
+    `keep_compressed`, the response cache or the schema view. Other bodies (search results, pages of one
+    client's cursor) would only push the reusable ones out of the cache.
+    """
+    return response.has_header('ETag') or getattr(response, 'keep_compressed', False)
+
+
+def keep_compressed(view):
+    """
+    Marks the responses of a view that serves the same body to everyone, like a static page.
+    """
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        response.keep_compressed = True
+        return response
+
+    return wrapped
+
+
+class CompressedBodies:
+    """
+    Compressed response bodies kept in the `COMPRESSION_CACHE_ALIAS` cache, keyed by the coding and a digest
+    of the uncompressed body. Responses that repeat byte for byte (the OpenAPI schema, the docs page, list
+    pages served from the response cache) are compressed once; hashing a body is much cheaper than
+    compressing it again. Bodies compressed with `store=False` are not kept.
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'COMPRESSION_CACHE_ALIAS', 'default')]
+
+    def compress(self, coding, body, encoder, store=True):
+        if not store:
+            return encoder(body)
+        key = 'compressed:{}:{}'.format(coding, hashlib.sha1(body).hexdigest())
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = encoder(body)
+            self.cache.set(key, compressed, timeout=getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 3600))
+        return compressed
+
+    def clear(self):
+        self.cache.clear()
+
+
+compressed_bodies = CompressedBodies()
@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+def configure_sqlite(connection):
+    """
+    Applies `SQLITE_PRAGMAS` to a new SQLite connection: WAL lets readers run alongside a writer,
+    synchronous=NORMAL is safe under WAL, and a busy timeout makes writers wait for the lock
+    instead of failing at once.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute('PRAGMA {} = {}'.format(pragma, value))
+
+
+def to_python_in_range(field, value, using=DEFAULT_DB_ALIAS):
+    """
+    Converts a query parameter with `field.to_python` (a foreign key converts like the field it points to) and
+    raises ValueError when that fails or when an integer doesn't fit the database column. Out of range
+    integers would otherwise only fail when the query runs, as a 500 (an OverflowError on SQLite).
+    """
+    field = getattr(field, 'target_field', field)
+    try:
+        value = field.to_python(value)
+    except DjangoValidationError as exc:
+        raise ValueError(exc.messages[0])
+    bounds = connections[using].ops.integer_field_ranges.get(field.get_internal_type())
+    if bounds is not None:
+        low, high = bounds
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ValueError('{} is out of range.'.format(value))
+    return value
+
+
+def is_lock_error(exc):
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+class DatabaseBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The database is busy, try again later.'
+    default_code = 'database_busy'
+
+
+class RetryOnLockMixin:
+    """
+    Retries writes that fail with "database is locked", up to `DATABASE_LOCK_RETRIES` times with
+    jittered exponential backoff, and answers 503 when the lock never frees up. Every attempt runs
+    in its own transaction (or savepoint), so a failed one leaves nothing behind.
+    """
+
+    def retry_on_lock(self, handler, *args, **kwargs):
+        retries = getattr(settings, 'DATABASE_LOCK_RETRIES', 3)
+        for attempt in range(retries + 1):
+            try:
+                with transaction.atomic():
+                    return handler(*args, **kwargs)
+            except OperationalError as exc:
+                if not is_lock_error(exc):
+                    raise
+            self.__dict__.pop('_object', None)
+            if attempt < retries:
+                time.sleep(0.05 * 2 ** attempt * random.uniform(0.5, 1.5))
+        raise DatabaseBusy()
+
+    def create(self, request, *args, **kwargs):
+        return self.retry_on_lock(super().create, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self.retry_on_lock(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self.retry_on_lock(super().destroy, request, *args, **kwargs)
+
+    def perform_bulk_write(self, serializer, items, upsert):
+        return self.retry_on_lock(super().perform_bulk_write, serializer, items, upsert)
@@ -0,0 +1,37 @@
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .search import search_quotes
+
+
+class QuoteSearchFilter(BaseFilterBackend):
+    """
+    Full-text search over the quote message with `?search=`, ranked by relevance.
+    """
+    search_param = 'search'
+
+    def get_search_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_quotes(queryset, terms)
+
+    def get_schema_fields(self, view):
+        return [coreapi.Field(name=self.search_param, required=False, location='query',
+                              schema=coreschema.String(description='Words that must all appear in the message.'))]
+
+
+class StableOrderingFilter(OrderingFilter):
+    """
+    `?ordering=` that always ends on the primary key, so rows with equal values keep a fixed order
+    across cursor pages.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view) or [])
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('id')
+        return ordering
@@ -0,0 +1,60 @@
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+
+from myApp.benchmark import DATASETS, BenchmarkSuite, compare
+from myApp.seeding import seed_quotes
+
+
+class Command(BaseCommand):
+    help = ('Measures latency percentiles and queries per request for every myApp route on a seeded dataset. '
+            'The data is loaded into a throwaway test database, never into the configured one. Compares the '
+            'results with a stored baseline and fails when a route got slower or runs more queries.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=sorted(DATASETS), default='1k', help='Dataset size.')
+        parser.add_argument('--quotes', type=int, help='Number of quotes, overrides the dataset size.')
+        parser.add_argument('--authors', type=int, help='Number of authors, overrides the dataset size.')
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per route.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', type=Path, help='JSON results of an earlier run to compare with.')
+        parser.add_argument('--save-baseline', type=Path, help='Write the results to this JSON file.')
+        parser.add_argument('--max-slowdown', type=float, default=2.0,
+                            help='Allowed p95 latency growth over the baseline, as a factor.')
+
+    def handle(self, *args, **options):
+        quotes, authors = DATASETS[options['dataset']]
+        quotes, authors = options['quotes'] or quotes, options['authors'] or authors
+
+        setup_test_environment()
+        databases = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        try:
+            started = time.perf_counter()
+            seed_quotes(quotes, authors, seed=options['seed'])
+            self.stdout.write('Seeded {} quotes across {} authors in {:.1f} s'.format(
+                quotes, authors, time.perf_counter() - started))
+            results = BenchmarkSuite(requests=options['requests'], seed=options['seed']).run()
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write('{:<28}{:>10}{:>10}{:>10}{:>9}'.format('route', 'p50 ms', 'p95 ms', 'p99 ms', 'queries'))
+        for label, result in results.items():
+            self.stdout.write('{:<28}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}{queries:>9}'.format(label, **result))
+
+        if options['save_baseline']:
+            options['save_baseline'].write_text(json.dumps(
+                {'quotes': quotes, 'authors': authors, 'routes': results}, indent=2))
+            self.stdout.write('Wrote baseline to {}'.format(options['save_baseline']))
+        if options['baseline']:
+            baseline = json.loads(options['baseline'].read_text())
+            regressions = compare(results, baseline['routes'], max_slowdown=options['max_slowdown'])
+            if regressions:
+                raise CommandError('Performance regressions against {}:\n  {}'.format(
+                    options['baseline'], '\n  '.join(regressions)))
+            self.stdout.write(self.style.SUCCESS('No regressions against {}'.format(options['baseline'])))
@@ -0,0 +1,104 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from myApp.benchmark import benchmark_environment
+
+
+class Command(BaseCommand):
+    help = ('Compares throughput of the sync API under WSGI and under ASGI with the async read views under ASGI. '
+            'The applications are driven in-process, so the numbers exclude the network and the web server. '
+            'The response cache and the rate limits are disabled while measuring.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per run.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Requests in flight at once.')
+        parser.add_argument('--resource', choices=['quotes', 'authors'], default='quotes')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user('benchmark-{}'.format(uuid.uuid4().hex))
+        headers = {'HTTP_AUTHORIZATION': 'Token ' + Token.objects.create(user=user).key}
+        resource = options['resource']
+        runs = [
+            ('WSGI  sync view ', self.run_wsgi, '/api/{}/'.format(resource)),
+            ('ASGI  sync view ', self.run_asgi, '/api/{}/'.format(resource)),
+            ('ASGI  async view', self.run_asgi, '/api/async/{}/'.format(resource)),
+        ]
+        try:
+            with benchmark_environment():
+                for name, run, path in runs:
+                    started = time.perf_counter()
+                    latencies = run(path, headers, options['requests'], options['concurrency'])
+                    self.report(name, latencies, time.perf_counter() - started)
+        finally:
+            user.delete()
+
+    def report(self, name, latencies, elapsed):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write('{}  {:8.1f} req/s   p50 {:7.2f} ms   p95 {:7.2f} ms'.format(
+            name, len(latencies) / elapsed, statistics.median(latencies) * 1000, p95 * 1000))
+
+    def run_wsgi(self, path, headers, requests, concurrency):
+        application = WSGIHandler()
+
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '8000', 'HTTP_HOST': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http', **headers,
+            }
+            statuses = []
+            started = time.perf_counter()
+            body = application(environ, lambda status, response_headers: statuses.append(status))
+            b''.join(body)
+            elapsed = time.perf_counter() - started
+            if not statuses[0].startswith('200'):
+                raise RuntimeError('{} answered {}'.format(path, statuses[0]))
+            return elapsed
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(call, range(requests)))
+
+    def run_asgi(self, path, headers, requests, concurrency):
+        application = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'query_string': b'', 'server': ('127.0.0.1', 8000), 'client': ('127.0.0.1', 50000),
+            'headers': [(b'host', b'127.0.0.1')] + [
+                (name[5:].lower().replace('_', '-').encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def call(semaphore):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                elapsed = time.perf_counter() - started
+            if messages[0]['status'] != 200:
+                raise RuntimeError('{} answered {}'.format(path, messages[0]['status']))
+            return elapsed
+
+        async def main():
+            semaphore = asyncio.Semaphore(concurrency)
+            return await asyncio.gather(*[call(semaphore) for _ in range(requests)])
+
+        return asyncio.run(main())
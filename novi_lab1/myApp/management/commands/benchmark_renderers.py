@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from myApp.benchmark import compare_renderers, sample_quotes
+
+
+class Command(BaseCommand):
+    help = ('Compares response size and render time of the available renderers (stdlib JSON, orjson, '
+            'MessagePack) on a page of generated quotes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quotes', type=int, default=1000, help='Quotes per rendered page.')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per renderer.')
+
+    def handle(self, *args, **options):
+        data = sample_quotes(options['quotes'])
+        self.stdout.write('{:<16}{:>12}{:>12}'.format('renderer', 'bytes', 'ms/render'))
+        for name, size, milliseconds in compare_renderers(data, repeat=options['repeat']):
+            self.stdout.write('{:<16}{:>12}{:>12.3f}'.format(name, size, milliseconds))
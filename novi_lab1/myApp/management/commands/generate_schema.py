@@ -0,0 +1,13 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Generates the OpenAPI schema and writes it to OPENAPI_SCHEMA_PATH.'
+
+    def handle(self, *args, **options):
+        artifact = import_module(settings.ROOT_URLCONF).schema_artifact
+        artifact.write()
+        self.stdout.write(self.style.SUCCESS('Wrote OpenAPI schema to {}'.format(artifact.path)))
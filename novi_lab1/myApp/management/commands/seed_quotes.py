@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from myApp.seeding import seed_quotes
+
+
+class Command(BaseCommand):
+    help = ('Fills the database with generated authors and quotes for load tests, using bulk inserts in large '
+            'transactions. On SQLite, fsyncs and the search index triggers are turned off while loading and the '
+            'search index is rebuilt at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quotes', type=int, default=100000, help='Number of quotes to create.')
+        parser.add_argument('--authors', type=int, default=1000, help='Number of authors to create.')
+        parser.add_argument('--zipf', type=float, default=1.0,
+                            help='Skew of quotes per author: the k-th author gets a share of 1/k^zipf. 0 is uniform.')
+        parser.add_argument('--mean-words', type=float, default=12, help='Average number of words per quote.')
+        parser.add_argument('--length-spread', type=float, default=0.5,
+                            help='Spread of the log-normal message length distribution.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; the same seed gives the same data.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT.')
+        parser.add_argument('--transaction-size', type=int, default=100000, help='Rows per transaction.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to fill.')
+
+    def handle(self, *args, **options):
+        if options['authors'] < 1 or options['quotes'] < 0:
+            raise CommandError('Needs at least one author and a non-negative number of quotes.')
+        if options['mean_words'] < 1 or options['length_spread'] < 0 or options['zipf'] < 0:
+            raise CommandError('--mean-words must be at least 1, --length-spread and --zipf not negative.')
+
+        started = time.perf_counter()
+
+        def progress(written):
+            self.stdout.write('{:>10} quotes  {:8.1f} s'.format(written, time.perf_counter() - started))
+
+        seed_quotes(options['quotes'], options['authors'], zipf=options['zipf'], mean_words=options['mean_words'],
+                    spread=options['length_spread'], seed=options['seed'], batch_size=options['batch_size'],
+                    transaction_size=options['transaction_size'], using=options['database'], progress=progress)
+        self.stdout.write(self.style.SUCCESS('Created {} authors and {} quotes in {:.1f} s'.format(
+            options['authors'], options['quotes'], time.perf_counter() - started)))
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metrics:
+    """
+    Per-view request counters and timings of this process, rendered in the Prometheus text format.
+    Each worker process keeps its own numbers; Prometheus sums them across the scraped targets.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(int)
+            self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+            self.durations = defaultdict(float)
+            self.counts = defaultdict(int)
+            self.sql_queries = defaultdict(int)
+            self.sql_seconds = defaultdict(float)
+            self.serialize_seconds = defaultdict(float)
+            self.render_seconds = defaultdict(float)
+
+    def observe(self, view, method, status, duration, queries, sql_seconds, serialize_seconds, render_seconds):
+        with self.lock:
+            self.requests[view, method, str(status)] += 1
+            buckets = self.buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+            self.durations[view] += duration
+            self.counts[view] += 1
+            self.sql_queries[view] += queries
+            self.sql_seconds[view] += sql_seconds
+            self.serialize_seconds[view] += serialize_seconds
+            self.render_seconds[view] += render_seconds
+
+    @staticmethod
+    def labels(**values):
+        return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                        for name, value in values.items())
+
+    def render(self):
+        lines = []
+
+        def family(name, kind, description):
+            lines.append('# HELP {} {}'.format(name, description))
+            lines.append('# TYPE {} {}'.format(name, kind))
+
+        with self.lock:
+            family('myapp_requests_total', 'counter', 'Requests handled, by view, method and status.')
+            for (view, method, status), value in sorted(self.requests.items()):
+                lines.append('myapp_requests_total{{{}}} {}'.format(
+                    self.labels(view=view, method=method, status=status), value))
+
+            family('myapp_request_duration_seconds', 'histogram', 'Time spent handling requests, by view.')
+            for view, buckets in sorted(self.buckets.items()):
+                for bound, value in zip(DURATION_BUCKETS, buckets):
+                    lines.append('myapp_request_duration_seconds_bucket{{{}}} {}'.format(
+                        self.labels(view=view, le=bound), value))
+                lines.append('myapp_request_duration_seconds_bucket{{{}}} {}'.format(
+                    self.labels(view=view, le='+Inf'), self.counts[view]))
+                lines.append('myapp_request_duration_seconds_sum{{{}}} {}'.format(
+                    self.labels(view=view), self.durations[view]))
+                lines.append('myapp_request_duration_seconds_count{{{}}} {}'.format(
+                    self.labels(view=view), self.counts[view]))
+
+            for name, description, values in (
+                    ('myapp_sql_queries_total', 'SQL queries run, by view.', self.sql_queries),
+                    ('myapp_sql_duration_seconds_total', 'Time spent in SQL queries, by view.', self.sql_seconds),
+                    ('myapp_serialize_duration_seconds_total', 'Time spent serializing rows, by view.',
+                     self.serialize_seconds),
+                    ('myapp_render_duration_seconds_total', 'Time spent rendering responses, by view.',
+                     self.render_seconds)):
+                family(name, 'counter', description)
+                for view, value in sorted(values.items()):
+                    lines.append('{}{{{}}} {}'.format(name, self.labels(view=view), value))
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timed_serialization(request):
+    """
+    Adds the time spent in the block to the request's serialization time, reported by `TimingMiddleware`.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing = getattr(request, '_serialize_timing', None)
+        if timing is not None:
+            timing['seconds'] += time.perf_counter() - started
+
+
+def metrics_view(request):
+    """
+    The metrics of this process, for the addresses in `METRICS_ALLOWED_IPS` and for staff users.
+    """
+    if request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            allowed = drf_request.user.is_staff
+        except APIException:
+            allowed = False
+        if not allowed:
+            return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import logging
+import re
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+from .compression import available_encoders, choose_encoding, compressed_bodies, is_compressible, keeps_compressed
+from .metrics import metrics
+
+logger = logging.getLogger('myApp.performance')
+
+STRONG_ETAG = re.compile(r'^"[^"]*"$')
+CODED_ETAG = re.compile(r'"([^"]*)-(br|zstd|gzip)"')
+
+current_query_timer = contextvars.ContextVar('current_query_timer', default=None)
+
+
+class QueryTimer:
+    """
+    `connection.execute_wrapper` that counts the SQL queries and adds up the time spent running them.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def time_async_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection (see `signals.py`). Under ASGI, Django 3.2 runs
+    the ORM calls of all requests in flight on one shared thread, so a wrapper added per request would count
+    the queries of the others too. This one hands each query to the timer of the request it runs for, which
+    `sync_to_async` carries over to that thread in the context.
+    """
+    timer = current_query_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+class TimingMiddleware:
+    """
+    Measures every request: total time, SQL queries and SQL time, the time spent turning rows into data in
+    the views (`timed_serialization`) and the time spent rendering that data to JSON. The numbers are sent
+    back in a `Server-Timing` header and added to the `/metrics` counters. Requests slower than
+    `SLOW_REQUEST_THRESHOLD_MS` are logged as warnings. Works in both the sync and the async stack, so
+    requests served under ASGI don't hop between threads to get through it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timer = QueryTimer()
+        started = self.start(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        return self.finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        timer = QueryTimer()
+        token = current_query_timer.set(timer)
+        started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_timer.reset(token)
+        return self.finish(request, response, timer, started)
+
+    @staticmethod
+    def start(request):
+        request._render_timing = {}
+        request._serialize_timing = {'seconds': 0.0}
+        return time.perf_counter()
+
+    def finish(self, request, response, timer, started):
+        duration = time.perf_counter() - started
+        render, serialize = request._render_timing, request._serialize_timing
+        render_seconds = render['end'] - render['start'] if 'end' in render else 0.0
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur={:.2f};desc="{} queries"'.format(timer.seconds * 1000, timer.count),
+            'serialize;dur={:.2f}'.format(serialize['seconds'] * 1000),
+            'render;dur={:.2f}'.format(render_seconds * 1000),
+            'total;dur={:.2f}'.format(duration * 1000),
+        ])
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        metrics.observe(view, request.method, response.status_code, duration, timer.count, timer.seconds,
+                        serialize['seconds'], render_seconds)
+
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        if threshold is not None and duration * 1000 >= threshold:
+            logger.warning('Slow request: %s %s took %.0f ms (%d queries, %.0f ms SQL, %.0f ms serialize, '
+                           '%.0f ms render)', request.method, request.get_full_path(), duration * 1000, timer.count,
+                           timer.seconds * 1000, serialize['seconds'] * 1000, render_seconds * 1000)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        render = request._render_timing
+        render['start'] = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: render.update(end=time.perf_counter()))
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best coding the client accepts: brotli or zstd when those packages are
+    installed, gzip otherwise. Bodies under `COMPRESSION_MIN_SIZE` bytes and content types that don't
+    compress well are sent as they are, and so are pages that embed the CSRF token, like the browsable API.
+    Bodies that are sent again and again are kept in `compressed_bodies`, so they are only compressed once.
+    Streaming responses are gzipped on the fly.
+
+    The compressed bytes are a different representation, so a strong ETag gets the coding as a suffix
+    (`"<hash>-gzip"`). The suffix is taken off `If-Match` and `If-None-Match` before the views compare
+    them, which keeps the tag strong enough for `If-Match` on writes. Like `TimingMiddleware`, it works
+    in both the sync and the async stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.encoders = available_encoders()
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    @staticmethod
+    def strip_etag_codings(request):
+        """
+        Removes the coding suffixes from the request's precondition headers and returns the codings seen.
+        """
+        codings = set()
+        for header in ('HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH'):
+            if header in request.META:
+                codings.update(match.group(2) for match in CODED_ETAG.finditer(request.META[header]))
+                request.META[header] = CODED_ETAG.sub(r'"\1"', request.META[header])
+        return codings
+
+    @staticmethod
+    def tag_etag(response, coding):
+        etag = response.get('ETag')
+        if etag and STRONG_ETAG.match(etag):
+            response['ETag'] = '"{}-{}"'.format(etag[1:-1], coding)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        codings = self.strip_etag_codings(request)
+        return self.compress(request, self.get_response(request), codings)
+
+    async def __acall__(self, request):
+        codings = self.strip_etag_codings(request)
+        return self.compress(request, await self.get_response(request), codings)
+
+    def compress(self, request, response, codings):
+        if response.status_code == 304:
+            # a 304 repeats the tag of the representation the client has
+            coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), list(self.encoders))
+            if coding in codings:
+                patch_vary_headers(response, ['Accept-Encoding'])
+                self.tag_etag(response, coding)
+            return response
+        if response.has_header('Content-Encoding') or not is_compressible(response.get('Content-Type', '')):
+            return response
+        if request.META.get('CSRF_COOKIE_USED'):
+            # the page embeds the CSRF token next to text taken from the request; compressing it would let
+            # an attacker recover the token from the response sizes (BREACH)
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+
+        patch_vary_headers(response, ['Accept-Encoding'])
+        available = ['gzip'] if response.streaming else list(self.encoders)
+        coding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available)
+        if coding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+            del response['Content-Length']
+        else:
+            body = compressed_bodies.compress(coding, response.content, self.encoders[coding],
+                                              store=keeps_compressed(response))
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response['Content-Length'] = str(len(body))
+
+        self.tag_etag(response, coding)
+        response['Content-Encoding'] = coding
+        return response
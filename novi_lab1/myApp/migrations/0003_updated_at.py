@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0002_quote_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
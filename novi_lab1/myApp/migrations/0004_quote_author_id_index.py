@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0003_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quote',
+            name='author',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, to='myApp.author'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['author', 'id'], name='quote_author_id_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:02
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_quotes(apps, schema_editor):
+    Author = apps.get_model('myApp', 'Author')
+    Quote = apps.get_model('myApp', 'Quote')
+    counts = Quote.objects.filter(author=OuterRef('pk')).order_by().values('author').annotate(n=Count('pk'))
+    Author.objects.update(cached_quote_count=Coalesce(Subquery(counts.values('n')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myApp', '0004_quote_author_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='cached_quote_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_quotes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,438 @@
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Max, Q
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .db import to_python_in_range
+from .metrics import timed_serialization
+from .models import Change
+from .parsers import NDJSONParser
+from .renderers import dumps
+from .serializers import RowMapping
+
+
+class ExportMixin:
+    """
+    Adds an `export` list route that streams every row as newline-delimited JSON.
+
+    Rows are read with `.iterator()` in chunks of `export_chunk_size` and serialized one at a time,
+    so memory stays flat no matter how big the table is. Query parameters named in `export_filters`
+    are passed to `.filter()`.
+    """
+    export_filters = ()
+    export_chunk_size = 2000
+
+    def filter_export_queryset(self, queryset):
+        lookups = {key: value for key, value in self.request.query_params.items() if key in self.export_filters}
+        try:
+            for key, value in lookups.items():
+                # bad values only fail once the query runs, after the streaming response has started
+                to_python_in_range(queryset.model._meta.get_field(key.split('__')[0]), value, queryset.db)
+            return queryset.filter(**lookups)
+        except (ValueError, TypeError, DjangoValidationError) as exc:
+            raise ValidationError({'detail': 'Invalid export filter: {}'.format(exc)})
+
+    def stream_rows(self, queryset):
+        serializer = self.get_serializer()
+        for instance in queryset.iterator(chunk_size=self.export_chunk_size):
+            yield dumps(serializer.to_representation(instance)) + b'\n'
+
+    @action(detail=False, methods=['get'])
+    def export(self, request, *args, **kwargs):
+        queryset = self.filter_export_queryset(self.get_queryset()).order_by('pk')
+        return StreamingHttpResponse(self.stream_rows(queryset), content_type='application/x-ndjson')
+
+
+class BatchMixin:
+    """
+    Adds a `batch` list route that returns the rows with the ids given in `?ids=1,2,3`, in that order,
+    read with a single `id__in` query. Ids without a row are listed under `missing`. At most
+    `batch_max_ids` ids are accepted per request.
+    """
+    batch_max_ids = 100
+
+    def get_batch_ids(self):
+        values = [value.strip() for value in self.request.query_params.get('ids', '').split(',') if value.strip()]
+        if not values:
+            raise ValidationError({'ids': ['Give a comma separated list of ids.']})
+        if len(values) > self.batch_max_ids:
+            raise ValidationError({'ids': ['Ensure this list has at most {} ids.'.format(self.batch_max_ids)]})
+        queryset = self.get_queryset()
+        ids, invalid = [], []
+        for value in values:
+            try:
+                ids.append(to_python_in_range(queryset.model._meta.pk, value, queryset.db))
+            except ValueError:
+                invalid.append(value)
+        if invalid:
+            raise ValidationError({'ids': ['Not valid ids: {}.'.format(', '.join(invalid))]})
+        return list(dict.fromkeys(ids))
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request, *args, **kwargs):
+        ids = self.get_batch_ids()
+        rows = {row.pk: row for row in self.get_queryset().filter(pk__in=ids)}
+        serializer = self.get_serializer([rows[pk] for pk in ids if pk in rows], many=True)
+        return Response({'results': serializer.data, 'missing': [pk for pk in ids if pk not in rows]})
+
+
+class BulkCreateMixin:
+    """
+    Adds a `bulk` route that creates many rows from a JSON array or an NDJSON body in one request.
+
+    Items are validated one by one by the serializer's list serializer, and the valid ones are written with
+    `bulk_create` inside a single transaction. Invalid items are reported by index and do not stop the rest.
+    With `?upsert=true`, items matching an existing row on `bulk_natural_key` update that row instead of
+    creating a duplicate.
+    """
+    bulk_natural_key = ()
+    bulk_max_items = 10000
+
+    @staticmethod
+    def natural_key_of(item, fields):
+        return tuple(getattr(item.get(name), 'pk', item.get(name)) for name in fields)
+
+    def find_existing(self, items, batch_size):
+        fields = self.bulk_natural_key
+        existing = {}
+        for start in range(0, len(items), batch_size):
+            keys = {self.natural_key_of(item, fields) for item in items[start:start + batch_size]}
+            lookup = Q()
+            for position, name in enumerate(fields):
+                values = {key[position] for key in keys}
+                condition = Q(**{name + '__in': values - {None}})
+                if None in values:
+                    condition |= Q(**{name + '__isnull': True})
+                lookup &= condition
+            for row in self.get_queryset().filter(lookup).values_list(*fields, 'pk'):
+                existing[tuple(row[:-1])] = row[-1]
+        return existing
+
+    def perform_bulk_upsert(self, serializer, items):
+        """
+        Updates the rows that already exist and returns `(items still to create, matched rows, updated rows)`.
+        Matched rows are only updated when the items carry fields outside `bulk_natural_key`.
+        """
+        fields = self.bulk_natural_key
+        existing = self.find_existing(items, serializer.batch_size)
+        model = self.get_queryset().model
+        new_items, matched, seen = [], [], set()
+        for item in items:
+            key = self.natural_key_of(item, fields)
+            if key in existing:
+                matched.append(model(pk=existing[key], **item))
+            elif key not in seen:
+                seen.add(key)
+                new_items.append(item)
+
+        update_fields = set.intersection(*[set(item) for item in items]) - set(fields) if items else set()
+        if not matched or not update_fields:
+            return new_items, matched, []
+        model.objects.bulk_update(matched, sorted(update_fields), batch_size=serializer.batch_size)
+        return new_items, matched, matched
+
+    def bulk_written(self, items):
+        """
+        Called with the validated items after they were written; `bulk_create` sends no model signals.
+        """
+
+    def perform_bulk_write(self, serializer, items, upsert):
+        """
+        Writes the validated items in one transaction and returns `(created instances, number of matched rows)`.
+        """
+        with transaction.atomic():
+            matched = []
+            if upsert and self.bulk_natural_key:
+                items, matched, _ = self.perform_bulk_upsert(serializer, items)
+            created = serializer.create(items)
+            self.bulk_written(items)
+        return created, len(matched)
+
+    @action(detail=False, methods=['post'], parser_classes=[*api_settings.DEFAULT_PARSER_CLASSES, NDJSONParser])
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True, max_length=self.bulk_max_items)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data
+        upsert = request.query_params.get('upsert', '').lower() in ('1', 'true')
+        created, matched = self.perform_bulk_write(serializer, items, upsert)
+
+        errors = [{'index': index, 'errors': detail} for index, detail in sorted(serializer.item_errors.items())]
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif not created and not matched:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response({'created': len(created), 'matched': matched, 'errors': errors}, status=response_status)
+
+
+class ChangeLogMixin:
+    """
+    Appends a `Change` for every row a create, update, delete or bulk write touches, in the same transaction
+    as the write: the change feed never shows a write that was rolled back and never misses one that was
+    committed. `change_resource` names the rows in the feed.
+
+    `change_related` maps foreign keys to `(resource, serializer class)` for related rows that change along
+    with the written rows, like an author's `quote_count` when quotes are added, removed or moved between
+    authors. Those rows are logged as updated too.
+    """
+    change_resource = None
+    change_related = {}
+
+    def log_changes(self, action, instances):
+        instances = list(instances)
+        data = self.get_serializer(instances, many=True).data
+        Change.objects.record(self.change_resource, action, zip([instance.pk for instance in instances], data))
+
+    def related_ids(self, instances):
+        return {name: {getattr(instance, name + '_id') for instance in instances} for name in self.change_related}
+
+    def log_related_changes(self, related_ids):
+        for name, ids in related_ids.items():
+            resource, serializer_class = self.change_related[name]
+            rows = list(serializer_class.Meta.model.objects.filter(pk__in=ids - {None}).order_by('pk'))
+            data = serializer_class(rows, many=True, context=self.get_serializer_context()).data
+            Change.objects.record(resource, Change.UPDATED, zip([row.pk for row in rows], data))
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        self.log_changes(Change.CREATED, [serializer.instance])
+        self.log_related_changes(self.related_ids([serializer.instance]))
+
+    def perform_update(self, serializer):
+        before = self.related_ids([serializer.instance])
+        super().perform_update(serializer)
+        self.log_changes(Change.UPDATED, [serializer.instance])
+        after = self.related_ids([serializer.instance])
+        # only a row that gained or lost this one changed
+        self.log_related_changes({name: ids ^ after[name] for name, ids in before.items()})
+
+    def perform_destroy(self, instance):
+        pk, related = instance.pk, self.related_ids([instance])
+        super().perform_destroy(instance)
+        Change.objects.record(self.change_resource, Change.DELETED, [(pk, None)])
+        self.log_related_changes(related)
+
+    def perform_bulk_upsert(self, serializer, items):
+        new_items, matched, updated = super().perform_bulk_upsert(serializer, items)
+        model = serializer.child.Meta.model
+        self.log_changes(Change.UPDATED, model.objects.filter(pk__in=[row.pk for row in updated]).order_by('pk'))
+        return new_items, matched, updated
+
+    def perform_bulk_write(self, serializer, items, upsert):
+        model = serializer.child.Meta.model
+        with transaction.atomic():
+            last_pk = model.objects.aggregate(last=Max('pk'))['last'] or 0
+            created, matched = super().perform_bulk_write(serializer, items, upsert)
+            pks = [instance.pk for instance in created]
+            if None in pks:
+                # SQLite doesn't return the ids of bulk inserted rows; they are the ones above the old maximum
+                rows = model.objects.filter(pk__gt=last_pk)
+            else:
+                rows = model.objects.filter(pk__in=pks)
+            rows = list(rows.order_by('pk'))
+            self.log_changes(Change.CREATED, rows)
+            self.log_related_changes(self.related_ids(rows))
+        return created, matched
+
+
+class SparseQuerysetMixin:
+    """
+    Narrows read querysets to the columns and joins the serializer needs for the request's `?fields=` and
+    `?expand=`. `updated_at` is always loaded because the ETag and Last-Modified headers are built from it.
+    """
+    sparse_always = ('updated_at',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.request
+        if request is not None and request.method in SAFE_METHODS:
+            queryset = self.get_serializer_class().optimize_queryset(queryset, request, *self.sparse_always)
+        return queryset
+
+
+class ConditionalMixin:
+    """
+    HTTP conditional requests driven by the models' `updated_at` column.
+
+    Retrieve and list responses carry an `ETag` and a `Last-Modified` header computed from the ids and
+    `updated_at` of the rows they contain. A matching `If-None-Match` or `If-Modified-Since` returns
+    304 before anything is serialized. Updates and deletes honour `If-Match` and `If-Unmodified-Since`
+    and answer 412 when the row changed since the client read it.
+    """
+    conditional_headers = ('HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE')
+
+    def get_object(self):
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.request
+        conditional = request is not None and any(header in request.META for header in self.conditional_headers)
+        if conditional and request.method not in SAFE_METHODS:
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def get_expanded(self):
+        """
+        Names of the related objects the response embeds with `?expand=`; their versions are part of the validators.
+        """
+        serializer_class = self.get_serializer_class()
+        if self.request.method not in SAFE_METHODS or not hasattr(serializer_class, 'get_sparse_options'):
+            return []
+        return serializer_class.get_sparse_options(self.request)[1]
+
+    def get_validators(self, instances, *extra):
+        # each representation (JSON, MessagePack, ...) gets its own validators
+        media_type = getattr(self.request, 'accepted_media_type', '')
+        digest = hashlib.md5('{}|{}'.format(media_type, self.request.META.get('QUERY_STRING', '')).encode())
+        expanded = self.get_expanded()
+        last_modified = None
+        for instance in instances:
+            for related in [None, *expanded]:
+                pk, updated_at = self.version_of(instance, related)
+                if updated_at is None:
+                    digest.update('{}:-;'.format(related).encode())
+                    continue
+                digest.update('{}:{};'.format(pk, updated_at.isoformat()).encode())
+                last_modified = max(last_modified or updated_at, updated_at)
+        for value in extra:
+            digest.update(repr(value).encode())
+        return quote_etag(digest.hexdigest()), last_modified and timegm(last_modified.utctimetuple())
+
+    @staticmethod
+    def version_of(instance, related=None):
+        """
+        `(pk, updated_at)` of `instance` or, with `related`, of the object it embeds under that name.
+        """
+        # rows read with `.values()` are dicts
+        if isinstance(instance, dict):
+            prefix = related + '__' if related else ''
+            return instance[prefix + 'id'], instance[prefix + 'updated_at']
+        if related:
+            instance = getattr(instance, related)
+            if instance is None:
+                return None, None
+        return instance.pk, instance.updated_at
+
+    @staticmethod
+    def set_validators(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    def check_preconditions(self, instances, *extra):
+        """
+        Returns `(response, etag, last_modified)`, where `response` is a 304/412 response when one of the
+        request's conditional headers fails and None otherwise.
+        """
+        etag, last_modified = self.get_validators(instances, *extra)
+        response = get_conditional_response(self.request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            self.set_validators(response, etag, last_modified)
+        return response, etag, last_modified
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        response, etag, last_modified = self.check_preconditions([instance])
+        if response is None:
+            with timed_serialization(request):
+                data = self.get_serializer(instance).data
+            response = self.set_validators(Response(data), etag, last_modified)
+        return response
+
+    def get_list_rows(self, queryset):
+        return queryset
+
+    def serialize_list(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows, extra = list(queryset), ()
+        else:
+            rows, extra = page, (self.get_paginated_response([]).data,)
+
+        response, etag, last_modified = self.check_preconditions(rows, *extra)
+        if response is None:
+            with timed_serialization(request):
+                data = self.serialize_list(rows)
+            response = self.get_paginated_response(data) if page is not None else Response(data)
+            self.set_validators(response, etag, last_modified)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = self.check_preconditions([self.get_object()])[0]
+            if response is not None:
+                return response
+            response = super().update(request, *args, **kwargs)
+        return self.set_validators(response, *self.get_validators([self.get_object()]))
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            response = self.check_preconditions([self.get_object()])[0]
+            return response or super().destroy(request, *args, **kwargs)
+
+
+class ValuesListMixin:
+    """
+    Serves list pages from `.values()` rows instead of model instances, for views that opt in.
+
+    The serializer is compiled into a `RowMapping` once per combination of `?fields=`, `?expand=` and
+    queryset annotations; the compiled mappings are kept on the class. The output is the same as the
+    serializer's. Lists fall back to the serializer when it can't be compiled or `LIST_FROM_VALUES` is off.
+    Relies on `ConditionalMixin.list`.
+    """
+    row_mappings = {}
+    row_mappings_max_size = 256
+    row_mapping = None
+
+    def get_row_mapping(self, queryset):
+        query = queryset.query
+        params = self.request.query_params
+        key = (self.get_serializer_class(), params.get('fields'), params.get('expand'), tuple(query.annotations))
+        try:
+            return self.row_mappings[key]
+        except KeyError:
+            pass
+        # another thread may clear the shared dict at any time, so the new mapping isn't read back from it
+        if len(self.row_mappings) >= self.row_mappings_max_size:
+            self.row_mappings.clear()
+        mapping = self.row_mappings[key] = RowMapping.compile(self.get_serializer(), query.annotations)
+        return mapping
+
+    def get_list_rows(self, queryset):
+        self.row_mapping = self.get_row_mapping(queryset) if settings.LIST_FROM_VALUES else None
+        if self.row_mapping is None:
+            return queryset
+        query = queryset.query
+        # the validators and the pagination cursors read these besides the serialized columns
+        ordering = [name.lstrip('-') for name in query.order_by if isinstance(name, str)]
+        columns = ['id', 'updated_at', *query.extra_select, *ordering, *self.row_mapping.columns]
+        for name in self.get_expanded():
+            columns.extend([name + '__id', name + '__updated_at'])
+        return queryset.values(*dict.fromkeys(columns))
+
+    def serialize_list(self, rows):
+        if self.row_mapping is None:
+            return super().serialize_list(rows)
+        return self.row_mapping.represent(rows)
@@ -1,11 +1,83 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+
+class AuthorQuerySet(models.QuerySet):
+    def with_quote_count(self):
+        """
+        Annotates `quote_count`, read from the `cached_quote_count` column when `AUTHOR_QUOTE_COUNT_DENORMALIZED`
+        is set and counted with one aggregate query otherwise.
+        """
+        if settings.AUTHOR_QUOTE_COUNT_DENORMALIZED:
+            return self.annotate(quote_count=F('cached_quote_count'))
+        return self.annotate(quote_count=Count('quote'))
+
+    def adjust_quote_counts(self, deltas):
+        """
+        Adds `deltas[author_id]` to the authors' `cached_quote_count` and touches their `updated_at`,
+        since the count is part of their representation. Quotes written without signals (e.g. `bulk_create`)
+        are not counted, so the counter never goes below zero.
+        """
+        now = timezone.now()
+        for pk, delta in deltas.items():
+            if pk is not None and delta:
+                count = Greatest(F('cached_quote_count') + delta, 0)
+                self.filter(pk=pk).update(cached_quote_count=count, updated_at=now)
+
+    def recount_quotes(self):
+        """
+        Recomputes `cached_quote_count` from the quote table, e.g. after quotes were bulk inserted.
+        """
+        counts = Quote.objects.filter(author=OuterRef('pk')).order_by().values('author').annotate(n=Count('pk'))
+        return self.update(cached_quote_count=Coalesce(Subquery(counts.values('n')), 0))
 
 
 class Author(models.Model):
     name = models.CharField(max_length=100)
     surname = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+    cached_quote_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = AuthorQuerySet.as_manager()
 
 
 class Quote(models.Model):
     message = models.TextField()
-    author = models.ForeignKey(Author, on_delete=models.SET_NULL, null=True)
+    author = models.ForeignKey(Author, on_delete=models.SET_NULL, null=True, db_index=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # serves author filters and the nested authors/{pk}/quotes/ pages in id order
+            models.Index(fields=['author', 'id'], name='quote_author_id_idx'),
+        ]
+
+
+class ChangeQuerySet(models.QuerySet):
+    def record(self, resource, action, rows):
+        """
+        Appends one change per `(object id, representation)` pair in `rows`.
+        """
+        return self.bulk_create([self.model(resource=resource, object_id=pk, action=action, data=data)
+                                 for pk, data in rows])
+
+
+class Change(models.Model):
+    """
+    Append-only log of the writes made through the API. The primary key is the sequence number consumers
+    sync from; `data` is the row's representation after the write, null for deletes.
+    """
+    CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+    ACTIONS = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+    RESOURCES = [('author', 'Author'), ('quote', 'Quote')]
+
+    resource = models.CharField(max_length=20, choices=RESOURCES)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    data = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeQuerySet.as_manager()
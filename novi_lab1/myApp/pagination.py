@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.db import connection
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the primary key.
+
+    Every page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n`` so
+    deep pages cost the same as the first one. Clients may ask for a smaller
+    or larger page with ``?page_size=``, capped by ``MAX_PAGE_SIZE`` from the
+    ``REST_FRAMEWORK`` settings.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 1000)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page-number pagination for ranked search results. Relevance is computed per query, so there is
+    no stable key to build a cursor from; search result sets are small enough for plain paging.
+    """
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 1000)
+
+
+class SincePagination(BasePagination):
+    """
+    Pages through an append-only table by sequence number: ``?since=<seq>``
+    returns the rows after ``seq`` in order, at most ``page_size`` of them.
+    ``last`` in the response is the ``since`` to send next time, even when
+    the page is empty, and ``next`` is set when more rows are already waiting.
+    ``since`` is capped at the largest id a ``BigAutoField`` holds, so a bigger
+    number reads no rows instead of failing in the database.
+    """
+    max_since = connection.ops.integer_field_ranges['BigAutoField'][1]
+    since_query_param = 'since'
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 100)
+        self.max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 1000)
+
+    @classmethod
+    def parse_since(cls, value):
+        try:
+            return _positive_int(value, cutoff=cls.max_since)
+        except (TypeError, ValueError):
+            raise ValidationError({cls.since_query_param: ['A valid sequence number is required.']})
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(request.query_params[self.page_size_query_param], strict=True,
+                                 cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.last = self.parse_since(request.query_params.get(self.since_query_param, 0))
+        page_size = self.get_page_size(request)
+        rows = list(queryset.filter(pk__gt=self.last).order_by('pk')[:page_size + 1])
+        self.has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if rows:
+            self.last = rows[-1].pk
+        return rows
+
+    def get_next_link(self):
+        if not self.has_more:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.since_query_param, self.last)
+
+    def get_paginated_response(self, data):
+        return Response({'last': self.last, 'next': self.get_next_link(), 'results': data})
+
+    def get_schema_fields(self, view):
+        return [
+            coreapi.Field(name=self.since_query_param, required=False, location='query',
+                          schema=coreschema.Integer(description='Return the rows after this sequence number.')),
+            coreapi.Field(name=self.page_size_query_param, required=False, location='query',
+                          schema=coreschema.Integer(description='Number of rows to return per page.')),
+        ]
@@ -0,0 +1,64 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses a newline-delimited JSON body into a list with one item per non-empty line.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if stream is None:
+            return []
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        items = []
+        for number, line in enumerate(stream, 1):
+            line = line.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as exc:
+                raise ParseError('NDJSON parse error on line {} - {}'.format(number, exc))
+        return items
+
+
+class FastJSONParser(JSONParser):
+    """
+    `JSONParser` backed by orjson, falling back to the standard parser without it.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - {}'.format(exc))
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses `application/msgpack` request bodies. Needs the `msgpack` package.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError) as exc:
+            raise ParseError('MessagePack parse error - {}'.format(exc))
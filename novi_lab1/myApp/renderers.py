@@ -0,0 +1,70 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# DRF's encoder knows the types orjson and msgpack don't (Decimal, lazy strings, QuerySet, ...)
+encode_default = JSONEncoder().default
+
+
+def dumps(data):
+    """
+    Compact UTF-8 JSON bytes, the same as `JSONRenderer` produces, using orjson when it is installed.
+    """
+    if orjson is None:
+        return JSONRenderer().render(data)
+    # like JSONRenderer: these are valid JSON but end a line in JavaScript
+    return orjson.dumps(data, default=encode_default).replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+        b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` backed by orjson. Indented output (`Accept: application/json; indent=4`) and setups
+    without orjson go through the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    MessagePack responses for `Accept: application/msgpack`. Needs the `msgpack` package.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets `Accept: text/event-stream` through content negotiation on server-sent event routes. The events
+    themselves are written by `EventStreamResponse`; this only renders errors, as an `error` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b'event: error\ndata: ' + dumps(data) + b'\n\n'
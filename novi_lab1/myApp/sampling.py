@@ -0,0 +1,26 @@
+import random
+
+from django.db.models import Max, Min
+
+
+def random_row(queryset, candidates=32, rounds=2):
+    """
+    Returns a uniformly random row of `queryset`, or None when it is empty, without `ORDER BY RANDOM()`.
+
+    Each round draws `candidates` ids from the queryset's id range and keeps the first one that exists,
+    which is one indexed lookup. Ids are mostly dense, so the first round nearly always hits; when the
+    range is too sparse for `rounds` rounds, the row is picked by offset from a count instead.
+    """
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return None
+    for _ in range(rounds):
+        ids = [random.randint(bounds['low'], bounds['high']) for _ in range(candidates)]
+        rows = queryset.in_bulk(ids)
+        for pk in ids:
+            if pk in rows:
+                return rows[pk]
+    count = queryset.count()
+    if not count:
+        return None
+    return queryset.order_by('pk')[random.randrange(count):][:1].first()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.urls import get_resolver
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, yaml_sane_dump
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.response import Response
+
+FINGERPRINT_KEY = 'x-urlconf-fingerprint'
+
+
+def view_fingerprint(view):
+    """
+    What the schema of a view is built from besides its route: the docstring, the serializer fields and the
+    classes that pick the parameters and media types.
+    """
+    parts = [view.__doc__ or '']
+    serializer_class = getattr(view, 'serializer_class', None)
+    if serializer_class is not None:
+        parts.append(repr(serializer_class()))
+    for attribute in ('pagination_class', 'filter_backends', 'renderer_classes', 'parser_classes'):
+        value = getattr(view, attribute, None)
+        classes = value if isinstance(value, (list, tuple)) else [value]
+        parts.append(' '.join('{}.{}'.format(cls.__module__, cls.__qualname__) for cls in classes if cls))
+    for name in ('ordering_fields', 'export_filters'):
+        parts.append(repr(getattr(view, name, None)))
+    return '\n'.join(parts)
+
+
+def urlconf_fingerprint(resolver=None):
+    """
+    Hash of every route in the URLconf together with the view that serves it and `view_fingerprint` of
+    that view, so changing a serializer or a docstring also invalidates the stored schema.
+    """
+    digest = hashlib.sha256()
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            if hasattr(pattern, 'url_patterns'):
+                walk(pattern.url_patterns, prefix + str(pattern.pattern))
+                continue
+            view = getattr(pattern.callback, 'cls', pattern.callback)
+            actions = sorted(getattr(pattern.callback, 'actions', None) or {})
+            digest.update('{}{} {} {}.{} {}\n'.format(prefix, pattern.pattern, pattern.name, view.__module__,
+                                                      view.__qualname__, actions).encode())
+            if view not in views:
+                views[view] = view_fingerprint(view)
+                digest.update(views[view].encode())
+
+    views = {}
+    walk((resolver or get_resolver()).url_patterns, '')
+    return digest.hexdigest()
+
+
+class SchemaArtifact:
+    """
+    OpenAPI document generated once and stored as JSON at `OPENAPI_SCHEMA_PATH`.
+
+    The file records the fingerprint of the URLconf and views it was built from. It is reused as long as the
+    fingerprint matches and regenerated (and rewritten) otherwise. Encoded bodies are kept in memory,
+    so serving the schema costs a dictionary lookup.
+    """
+
+    def __init__(self, info, generator_class=OpenAPISchemaGenerator):
+        self.info = info
+        self.generator_class = generator_class
+        self._resolver = None
+        self._fingerprint = None
+        self._spec = None
+        self._last_modified = None
+        self._encoded = {}
+
+    @property
+    def path(self):
+        return Path(settings.OPENAPI_SCHEMA_PATH)
+
+    def fingerprint(self):
+        resolver = get_resolver()
+        if resolver is not self._resolver:
+            self._resolver, self._fingerprint = resolver, urlconf_fingerprint(resolver)
+        return self._fingerprint
+
+    def generate(self):
+        schema = self.generator_class(self.info).get_schema(request=None, public=True)
+        spec = OpenAPICodecJson(validators=[]).generate_swagger_object(schema)
+        spec[FINGERPRINT_KEY] = self.fingerprint()
+        return json.loads(json.dumps(spec), object_pairs_hook=OrderedDict)
+
+    def read(self):
+        try:
+            with open(self.path) as file:
+                spec = json.load(file, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return None
+        return spec if spec.get(FINGERPRINT_KEY) == self.fingerprint() else None
+
+    def write(self, spec=None):
+        spec = spec or self.generate()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w') as file:
+            json.dump(spec, file, indent=2)
+        self.reset()
+        return spec
+
+    def reset(self):
+        self._spec = None
+        self._encoded = {}
+
+    def load(self):
+        if self._spec is not None and self._spec[FINGERPRINT_KEY] == self.fingerprint():
+            return self._spec
+
+        self.reset()
+        spec = self.read()
+        if spec is None:
+            spec = self.generate()
+            try:
+                self.write(spec)
+            except OSError:
+                pass
+        try:
+            self._last_modified = os.path.getmtime(self.path)
+        except OSError:
+            self._last_modified = time.time()
+        self._spec = spec
+        return spec
+
+    def encode(self, format):
+        """
+        Returns `(body, etag, last_modified)` for the schema as `json` or `yaml`.
+        """
+        spec = self.load()
+        if format not in self._encoded:
+            body = yaml_sane_dump(spec, binary=True) if format == 'yaml' else json.dumps(spec).encode()
+            self._encoded[format] = (body, quote_etag(hashlib.md5(body).hexdigest()))
+        body, etag = self._encoded[format]
+        return body, etag, self._last_modified
+
+
+def cached_schema_view(schema_view, artifact):
+    """
+    Subclasses a drf_yasg schema view so that the OpenAPI document is served from `artifact`
+    with `ETag` and `Last-Modified` headers instead of being generated on every request.
+    The web UI pages only show the title and version and fetch the document from the schema URL, so they
+    are rendered from an empty document built from `artifact.info`.
+    """
+
+    class CachedSchemaView(schema_view):
+        schema_artifact = artifact
+
+        def get(self, request, version='', format=None):
+            renderer = request.accepted_renderer
+            if getattr(renderer, 'codec_class', None) is None:
+                version = request.version or version
+                response = Response(openapi.Swagger(info=self.schema_artifact.info, _prefix='/', _version=version,
+                                                    paths=openapi.Paths({})))
+                response.keep_compressed = True
+                return response
+
+            body, etag, last_modified = self.schema_artifact.encode('yaml' if 'yaml' in renderer.format else 'json')
+            response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+            if response is None:
+                response = HttpResponse(body, content_type='{}; charset={}'.format(renderer.media_type,
+                                                                                 renderer.charset))
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+
+    return CachedSchemaView
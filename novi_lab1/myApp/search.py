@@ -0,0 +1,78 @@
+import re
+
+from django.db import connections
+
+from .models import Quote
+
+QUOTE_TABLE = Quote._meta.db_table
+FTS_TABLE = QUOTE_TABLE + '_fts'
+
+FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(message, content='{table}', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN "
+    "INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message); END",
+    "CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF message ON {table} BEGIN "
+    "INSERT INTO {fts}({fts}, rowid, message) VALUES ('delete', old.id, old.message); "
+    "INSERT INTO {fts}(rowid, message) VALUES (new.id, new.message); END",
+]
+FTS_TRIGGERS = ['{}_insert'.format(FTS_TABLE), '{}_delete'.format(FTS_TABLE), '{}_update'.format(FTS_TABLE)]
+
+
+def supports_fts(connection):
+    return connection.vendor == 'sqlite'
+
+
+def install_fts(connection, rebuild=False):
+    """
+    Creates the FTS5 index over `Quote.message` and the triggers that keep it in sync. Safe to run
+    repeatedly: SQLite drops a table's triggers whenever a migration rebuilds the table, so they are
+    re-created after every migrate, and the index is rebuilt from scratch if any of them was missing.
+    """
+    if not supports_fts(connection) or QUOTE_TABLE not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+                       FTS_TRIGGERS)
+        rebuild = rebuild or len(cursor.fetchall()) < len(FTS_TRIGGERS)
+        for statement in FTS_SCHEMA:
+            cursor.execute(statement.format(fts=FTS_TABLE, table=QUOTE_TABLE))
+        if rebuild:
+            cursor.execute("INSERT INTO {fts}({fts}) VALUES ('rebuild')".format(fts=FTS_TABLE))
+
+
+def uninstall_fts(connection):
+    if not supports_fts(connection):
+        return
+    with connection.cursor() as cursor:
+        for trigger in FTS_TRIGGERS:
+            cursor.execute('DROP TRIGGER IF EXISTS {}'.format(trigger))
+        cursor.execute('DROP TABLE IF EXISTS {}'.format(FTS_TABLE))
+
+
+def fts_query(terms):
+    """
+    Turns free text into an FTS5 query that matches rows containing every word, so user input
+    can never be interpreted as FTS5 query syntax.
+    """
+    words = re.findall(r'\w+', terms)
+    return ' '.join('"{}"'.format(word) for word in words)
+
+
+def search_quotes(queryset, terms):
+    """
+    Filters `queryset` to quotes whose message matches `terms`, best matches first.
+    Backends without FTS5 fall back to an unranked `icontains` match.
+    """
+    if not supports_fts(connections[queryset.db]):
+        return queryset.filter(message__icontains=terms)
+    query = fts_query(terms)
+    if not query:
+        return queryset.none()
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=['{fts}.rowid = {table}.id'.format(fts=FTS_TABLE, table=QUOTE_TABLE), '{} MATCH %s'.format(FTS_TABLE)],
+        params=[query],
+        select={'search_rank': '{}.rank'.format(FTS_TABLE)},
+    ).order_by('search_rank', 'id')
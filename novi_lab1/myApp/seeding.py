@@ -0,0 +1,107 @@
+import itertools
+import math
+import random
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+
+from .cache import response_cache
+from .db import configure_sqlite
+from .models import Author, Quote
+from .search import FTS_TRIGGERS, install_fts, supports_fts
+
+FIRST_NAMES = ('Ana', 'Ivan', 'Marko', 'Petra', 'Luka', 'Maja', 'Josip', 'Iva', 'Karlo', 'Lucija', 'Oscar', 'Mark',
+               'Jane', 'Albert', 'Marie', 'Leo', 'Virginia', 'Franz', 'Simone', 'Fyodor')
+SURNAMES = ('Horvat', 'Kovac', 'Babic', 'Maric', 'Novak', 'Juric', 'Wilde', 'Twain', 'Austen', 'Einstein',
+            'Curie', 'Tolstoy', 'Woolf', 'Kafka', 'Beauvoir', 'Dostoevsky', 'Krleza', 'Ujevic', 'Tesla', 'Andric')
+WORDS = ('life', 'love', 'time', 'world', 'truth', 'mind', 'heart', 'light', 'dream', 'hope', 'fear', 'power',
+         'friend', 'death', 'change', 'peace', 'wisdom', 'story', 'nature', 'freedom', 'is', 'the', 'of', 'and',
+         'never', 'always', 'only', 'every', 'what', 'we', 'you', 'our', 'not', 'a', 'in', 'to')
+
+
+@contextmanager
+def relaxed_sqlite(connection):
+    """
+    Trades durability for load speed on SQLite while seeding: no fsyncs, a big page cache and no FTS insert
+    trigger. The quote search index is rebuilt once at the end and the configured pragmas are restored.
+    """
+    if not supports_fts(connection):
+        yield
+        return
+    # SQLite refuses to change the safety level and temp storage inside a transaction
+    outside_transaction = not connection.in_atomic_block
+    with connection.cursor() as cursor:
+        if outside_transaction:
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA temp_store = MEMORY')
+        cursor.execute('PRAGMA cache_size = -262144')
+        cursor.execute('DROP TRIGGER IF EXISTS {}'.format(FTS_TRIGGERS[0]))
+    try:
+        yield
+    finally:
+        # a missing trigger makes install_fts rebuild the whole index
+        install_fts(connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size = -2000')
+            if outside_transaction:
+                cursor.execute('PRAGMA temp_store = DEFAULT')
+        if outside_transaction:
+            configure_sqlite(connection)
+
+
+def zipf_weights(count, exponent):
+    """
+    Cumulative weights where the k-th author gets a share proportional to 1 / k ** exponent; 0 is uniform.
+    """
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def message_lengths(rng, mean_words, spread):
+    """
+    Endless word counts from a log-normal distribution with the given mean, like real quote lengths:
+    mostly short, with a long tail. `spread` is the sigma of the underlying normal distribution.
+    """
+    mu = math.log(mean_words) - spread ** 2 / 2
+    while True:
+        yield max(1, round(rng.lognormvariate(mu, spread)))
+
+
+def seed_quotes(quotes, authors, zipf=1.0, mean_words=12, spread=0.5, seed=0, batch_size=5000,
+                transaction_size=100000, using='default', progress=None):
+    """
+    Inserts `authors` new authors and `quotes` new quotes with `bulk_create`, `transaction_size` rows per
+    transaction. Quotes are spread over the new authors with a Zipf-like skew, so a few authors have most
+    of the quotes. `progress` is called with the number of quotes written so far after every transaction.
+    """
+    rng = random.Random(seed)
+    connection = connections[using]
+    with relaxed_sqlite(connection):
+        with transaction.atomic(using=using):
+            created = Author.objects.using(using).bulk_create(
+                [Author(name=rng.choice(FIRST_NAMES), surname=rng.choice(SURNAMES)) for _ in range(authors)],
+                batch_size=batch_size)
+            if created and created[0].pk is None:
+                created = Author.objects.using(using).order_by('-pk')[:authors][::-1]
+        author_ids = [author.pk for author in created]
+        rng.shuffle(author_ids)
+        weights = zipf_weights(len(author_ids), zipf)
+        lengths = message_lengths(rng, mean_words, spread)
+
+        written = 0
+        while written < quotes:
+            with transaction.atomic(using=using):
+                chunk = min(transaction_size, quotes - written)
+                for start in range(0, chunk, batch_size):
+                    size = min(batch_size, chunk - start)
+                    Quote.objects.using(using).bulk_create([
+                        Quote(message=' '.join(rng.choices(WORDS, k=next(lengths))).capitalize() + '.',
+                              author_id=author_id)
+                        for author_id in rng.choices(author_ids, cum_weights=weights, k=size)
+                    ])
+                written += chunk
+            if progress is not None:
+                progress(written)
+
+        Author.objects.using(using).recount_quotes()
+    response_cache.clear()
+    return author_ids
@@ -1,15 +1,252 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
 
-from .models import Author, Quote
+from .models import Author, Change, Quote
 
 
-class AuthorSerializer(serializers.ModelSerializer):
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves primary keys against `context['preloaded'][model]` when the caller loaded the related rows in
+    advance, so validating many items costs one query instead of one per item.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Validates each item on its own and keeps going past invalid ones. Valid items end up in
+    `validated_data`, errors in `item_errors` keyed by the item's position in the payload.
+    Saving writes the valid items with `bulk_create` in batches of `batch_size`.
+    """
+    batch_size = 500
+
+    def preload(self, data):
+        preloaded = self._context.setdefault('preloaded', {})
+        for name, field in self.child.fields.items():
+            if field.read_only or not isinstance(field, PreloadedPrimaryKeyRelatedField):
+                continue
+            pks = set()
+            for item in data:
+                try:
+                    pks.add(int(item[name]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            queryset = field.get_queryset()
+            preloaded.setdefault(queryset.model, {}).update(queryset.in_bulk(pks))
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if self.max_length is not None and len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise serializers.ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        self.preload([item for item in data if isinstance(item, dict)])
+        self.item_errors = {}
+        validated = []
+        for index, item in enumerate(data):
+            try:
+                validated.append(self.child.run_validation(item))
+            except serializers.ValidationError as exc:
+                self.item_errors[index] = exc.detail
+        return validated
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create([model(**item) for item in validated_data], batch_size=self.batch_size)
+
+
+class SparseFieldsMixin:
+    """
+    Lets read requests ask for a subset of the fields with `?fields=id,message` and embed the related objects
+    listed in `expandable_fields` with `?expand=author`. Writes always use every field.
+
+    `optimize_queryset` narrows a queryset to the columns and joins the same request will serialize.
+    """
+    expandable_fields = {}
+
+    @staticmethod
+    def parse_names(request, param):
+        value = request.query_params.get(param)
+        return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+    @classmethod
+    def get_sparse_options(cls, request):
+        """
+        Returns `(requested field names or None, names to expand)` and rejects names the serializer doesn't have.
+        """
+        names = cls.parse_names(request, 'fields')
+        expand = cls.parse_names(request, 'expand')
+        errors = {}
+        unknown = set(names) - set(cls().get_fields())
+        if unknown:
+            errors['fields'] = ['Unknown field(s): {}.'.format(', '.join(sorted(unknown)))]
+        unknown = set(expand) - set(cls.expandable_fields)
+        if unknown:
+            errors['expand'] = ['Field(s) cannot be expanded: {}.'.format(', '.join(sorted(unknown)))]
+        if errors:
+            raise serializers.ValidationError(errors)
+        if names:
+            expand = [name for name in expand if name in names]
+        return names or None, expand
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request, *always):
+        """
+        Joins the expanded relations and, when `fields` is given, defers every other column except `always`.
+        """
+        names, expand = cls.get_sparse_options(request)
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if names is not None:
+            model = queryset.model
+            columns = {field.name for field in model._meta.concrete_fields}
+            only = [model._meta.pk.name, *always, *[name for name in names if name in columns]]
+            for name in expand:
+                related = model._meta.get_field(name).related_model
+                only.extend('{}__{}'.format(name, field.name) for field in related._meta.concrete_fields)
+            queryset = queryset.only(*only)
+        return queryset
+
+    def is_sparse_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self.is_sparse_root():
+            return fields
+        names, expand = self.get_sparse_options(request)
+        for name in expand:
+            fields[name] = self.expandable_fields[name](read_only=True)
+        if names is not None:
+            fields = {name: field for name, field in fields.items() if name in names}
+        return fields
+
+
+class AuthorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    quote_count = serializers.SerializerMethodField()
+    row_columns = {'quote_count': 'cached_quote_count'}
+
     class Meta:
         model = Author
-        fields = '__all__'
+        exclude = ['cached_quote_count']
+
+    def get_quote_count(self, author):
+        # lists annotate the count; authors loaded any other way fall back to the counter column
+        if hasattr(author, 'quote_count'):
+            return author.quote_count
+        return author.cached_quote_count
+
 
+class QuoteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
+    expandable_fields = {'author': AuthorSerializer}
 
-class QuoteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Quote
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    seq = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = Change
+        fields = ['seq', 'resource', 'object_id', 'action', 'data', 'created_at']
+
+
+class RowMapping:
+    """
+    Builds the same representation as a serializer straight from the dicts of a `.values()` query, without
+    going through model instances and the fields' `get_attribute`.
+
+    `compile` walks the serializer's fields once and keeps, for every field, the column to read and the
+    conversion to apply, so representing a row is a loop over plain tuples. Columns that come back from the
+    database in their final form (strings, integers, primary keys) are copied as they are. Nested serializers
+    read the columns of the joined table. Method fields are read from a queryset annotation of the same name
+    or from the column the serializer lists in `row_columns`. Serializers with any other kind of field can't
+    be compiled and `compile` returns None.
+    """
+    PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+                    serializers.ReadOnlyField)
+
+    def __init__(self, items):
+        self.items = items
+
+    @property
+    def columns(self):
+        columns = []
+        for name, column, convert, nested in self.items:
+            columns.append(column)
+            if nested is not None:
+                columns.extend(nested.columns)
+        return columns
+
+    @classmethod
+    def compile(cls, serializer, annotations=(), prefix=''):
+        model = serializer.Meta.model
+        model_fields = {field.name: field for field in model._meta.concrete_fields}
+        row_columns = getattr(serializer, 'row_columns', {})
+        items = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if isinstance(field, serializers.SerializerMethodField):
+                column = name if name in annotations else row_columns.get(name)
+                if column is None:
+                    return None
+                items.append((name, prefix + column, None, None))
+            elif isinstance(field, serializers.BaseSerializer):
+                if isinstance(field, serializers.ListSerializer) or source not in model_fields:
+                    return None
+                nested = cls.compile(field, prefix='{}{}__'.format(prefix, source))
+                if nested is None:
+                    return None
+                items.append((name, prefix + source, None, nested))
+            elif source in model_fields or source in annotations:
+                if isinstance(field, serializers.RelatedField):
+                    if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.pk_field is not None:
+                        return None
+                    convert = None
+                else:
+                    convert = None if isinstance(field, cls.PLAIN_FIELDS) else field.to_representation
+                items.append((name, prefix + source, convert, None))
+            else:
+                return None
+        return cls(items)
+
+    def to_representation(self, row):
+        data = {}
+        for name, column, convert, nested in self.items:
+            value = row[column]
+            if value is not None:
+                if nested is not None:
+                    value = nested.to_representation(row)
+                elif convert is not None:
+                    value = convert(value)
+            data[name] = value
+        return data
+
+    def represent(self, rows):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
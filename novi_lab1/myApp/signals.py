@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .cache import response_cache
+from .db import configure_sqlite
+from .middleware import time_async_queries
+from .models import Author, Quote
+from .search import install_fts
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    configure_sqlite(connection)
+
+
+@receiver(connection_created)
+def install_async_query_timing(sender, connection, **kwargs):
+    if time_async_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_async_queries)
+
+
+@receiver(post_delete, sender=Token)
+def revoke_cached_token(sender, instance, **kwargs):
+    token_cache.revoke(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def revoke_cached_user_tokens(sender, instance, **kwargs):
+    token_cache.revoke_user(instance.pk)
+
+
+@receiver(post_migrate)
+def install_quote_search_index(sender, using, **kwargs):
+    if sender.name == 'myApp':
+        install_fts(connections[using])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_delete, sender=Author)
+def invalidate_author_responses(sender, instance, **kwargs):
+    response_cache.invalidate('authors', 'author:{}'.format(instance.pk))
+
+
+@receiver(pre_delete, sender=Author)
+def invalidate_orphaned_quote_responses(sender, instance, **kwargs):
+    # on_delete=SET_NULL updates the author's quotes without sending signals for them or touching their
+    # updated_at, which the ETags and Last-Modified headers are built from
+    quotes = Quote.objects.filter(author=instance)
+    quotes.update(updated_at=timezone.now())
+    quote_ids = quotes.values_list('pk', flat=True)
+    response_cache.invalidate('quotes', 'author:{}:quotes'.format(instance.pk),
+                              *['quote:{}'.format(pk) for pk in quote_ids])
+
+
+@receiver(pre_save, sender=Quote)
+def remember_previous_author(sender, instance, **kwargs):
+    if instance.pk is not None:
+        previous = Quote.objects.filter(pk=instance.pk).values_list('author_id', flat=True)
+        instance._previous_author_id = previous.first()
+
+
+@receiver(post_save, sender=Quote)
+@receiver(post_delete, sender=Quote)
+def update_author_quote_counts(sender, instance, signal, created=False, **kwargs):
+    previous_author_id = getattr(instance, '_previous_author_id', None)
+    if signal is post_delete:
+        deltas = {instance.author_id: -1}
+    elif created:
+        deltas = {instance.author_id: 1}
+    elif previous_author_id != instance.author_id:
+        deltas = {previous_author_id: -1, instance.author_id: 1}
+    else:
+        return
+    Author.objects.adjust_quote_counts(deltas)
+    response_cache.invalidate('authors', *['author:{}'.format(pk) for pk in deltas if pk is not None])
+
+
+@receiver(post_save, sender=Quote)
+@receiver(post_delete, sender=Quote)
+def invalidate_quote_responses(sender, instance, **kwargs):
+    author_ids = {instance.author_id, getattr(instance, '_previous_author_id', None)} - {None}
+    response_cache.invalidate('quotes', 'quote:{}'.format(instance.pk),
+                              *['author:{}:quotes'.format(pk) for pk in author_ids])
@@ -0,0 +1,131 @@
+"""
+Server-sent events for Django 3.2.
+
+Django 3.2 sends streaming responses under ASGI by iterating them synchronously on the event loop, so a
+stream that waits for new events would stall every other request. `StreamingASGIHandler` sends
+`EventStreamResponse`s with `async for` instead and stops as soon as the client goes away. The same
+responses still work under WSGI and in the test client, which iterate them synchronously.
+"""
+import asyncio
+import contextvars
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.http import StreamingHttpResponse
+
+from .renderers import dumps
+
+current_receive = contextvars.ContextVar('current_receive')
+
+
+class EventStream:
+    """
+    Server-sent events read by polling. `fetch(last_id)` returns the events after `last_id`, oldest first,
+    as `(id, event, data)` tuples. The stream asks for more every `poll_interval` seconds, sends a comment
+    when nothing was sent for `keepalive` seconds so proxies keep the connection open, and ends after
+    `timeout` seconds; clients reconnect on their own and resume from the `Last-Event-ID` they saw last.
+    """
+
+    def __init__(self, fetch, last_id, poll_interval=1.0, keepalive=15.0, timeout=300.0):
+        self.fetch = fetch
+        self.last_id = last_id
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self.timeout = timeout
+
+    @staticmethod
+    def format(event_id, event, data):
+        return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event.encode(), dumps(data))
+
+    def poll(self):
+        events = self.fetch(self.last_id)
+        if events:
+            self.last_id = events[-1][0]
+        return b''.join(self.format(*event) for event in events)
+
+    def next_chunk(self, chunk, now):
+        if chunk:
+            self.sent_at = now
+        elif now - self.sent_at >= self.keepalive:
+            self.sent_at, chunk = now, b': keep-alive\n\n'
+        return chunk
+
+    def start(self):
+        self.sent_at = time.monotonic()
+        self.deadline = self.sent_at + self.timeout
+        return b'retry: %d\n\n' % (self.poll_interval * 1000)
+
+    def __iter__(self):
+        yield self.start()
+        while True:
+            chunk = self.next_chunk(self.poll(), time.monotonic())
+            if chunk:
+                yield chunk
+            if time.monotonic() >= self.deadline:
+                return
+            time.sleep(self.poll_interval)
+
+    async def __aiter__(self):
+        yield self.start()
+        while True:
+            chunk = self.next_chunk(await sync_to_async(self.poll)(), time.monotonic())
+            if chunk:
+                yield chunk
+            if time.monotonic() >= self.deadline:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    def __init__(self, events, **kwargs):
+        super().__init__(events, content_type='text/event-stream', **kwargs)
+        self.events = events
+        self['Cache-Control'] = 'no-cache'
+        # nginx would otherwise buffer the events
+        self['X-Accel-Buffering'] = 'no'
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, except that `EventStreamResponse`s are iterated with `async for`.
+    """
+
+    async def __call__(self, scope, receive, send):
+        current_receive.set(receive)
+        await super().__call__(scope, receive, send)
+
+    async def send_response(self, response, send):
+        if not isinstance(response, EventStreamResponse):
+            return await super().send_response(response, send)
+
+        headers = [(header.encode('ascii'), value.encode('latin1')) for header, value in response.items()]
+        headers.extend((b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+                       for cookie in response.cookies.values())
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+
+        events = response.events.__aiter__()
+        disconnected = asyncio.ensure_future(wait_for_disconnect(current_receive.get()))
+        try:
+            while True:
+                chunk = asyncio.ensure_future(events.__anext__())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    await asyncio.gather(chunk, return_exceptions=True)
+                    break
+                try:
+                    body = chunk.result()
+                except StopAsyncIteration:
+                    break
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            disconnected.cancel()
+            await events.aclose()
+        await sync_to_async(response.close, thread_sensitive=True)()
@@ -1,8 +1,50 @@
-from rest_framework.test import APITestCase
+import asyncio
+import datetime
+import gzip
+import io
+import json
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from rest_framework import serializers, test
+from rest_framework.test import APIRequestFactory
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.core.handlers.asgi import ASGIHandler
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.conf import settings
+from drf_yasg.generators import OpenAPISchemaGenerator
 from rest_framework import status
 
-from .models import Author, Quote
+from novi_lab1.urls import schema_artifact
+from .authentication import CachedTokenAuthentication, token_cache
+from .benchmark import ROUTES, BenchmarkSuite, compare
+from .cache import response_cache
+from .compression import choose_encoding, compressed_bodies
+from . import renderers
+from .metrics import metrics
+from .models import Author, Change, Quote
+from .pagination import SincePagination
+from .schema import FINGERPRINT_KEY, urlconf_fingerprint
+from .search import FTS_TRIGGERS, install_fts, search_quotes
+from .renderers import FastJSONRenderer
+from .seeding import seed_quotes
+from .streaming import EventStream, EventStreamResponse, StreamingASGIHandler, current_receive
+from .serializers import AuthorSerializer, QuoteSerializer, RowMapping
+from .throttling import SlidingWindowThrottle
+from .views import AuthorAPI
 
 HOST = 'http://127.0.0.1:8000'
 SUPERUSER_NAME = "Jane"
@@ -10,6 +52,29 @@ SUPERUSER_EMAIL = "jane.doe@tests.dev"
 SUPERUSER_PASSWORD = "password123"
 
 
+class APITestCase(test.APITestCase):
+    """
+    Starts every test with an empty response cache: rolling back a test's data sends no model signals,
+    so entries cached by one test would otherwise be served to the next. Throttle counters are reset too.
+    The OpenAPI schema is written to a temporary directory instead of the project.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        override = override_settings(OPENAPI_SCHEMA_PATH=Path(directory.name) / 'openapi.json')
+        override.enable()
+        cls.addClassCleanup(override.disable)
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        response_cache.clear()
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        compressed_bodies.clear()
+
+
 def get_url(url: str):
     if not url.endswith("/"):
         url += "/"
@@ -389,3 +454,1589 @@ class AuthorQuoteAPI(APITestCase):
 
         response = self.client.put(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class PaginationTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        author = Author.objects.create(name='Test', surname='Test')
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=author) for i in range(5)])
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_walk_Quotes_with_cursor(self):
+        url = get_url('/api/quotes/') + '?page_size=2'
+        messages = []
+        self.login()
+        while url:
+            response = self.client.get(url, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            messages += [quote['message'] for quote in response.data['results']]
+            url = response.data['next']
+        self.logout()
+
+        self.assertEqual(messages, ['Test message {}'.format(i) for i in range(5)])
+
+    def test_previous_cursor(self):
+        self.login()
+        response = self.client.get(get_url('/api/quotes/') + '?page_size=2', format='json')
+        first_page = response.data['results']
+        response = self.client.get(response.data['next'], format='json')
+        response = self.client.get(response.data['previous'], format='json')
+        self.logout()
+
+        self.assertEqual(response.data['results'], first_page)
+
+    def test_page_size_is_capped(self):
+        self.login()
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'MAX_PAGE_SIZE': 3}):
+            response = self.client.get(get_url('/api/quotes/') + '?page_size=50', format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+
+class ExportTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Test', surname=str(i)) for i in range(2)]
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.authors[i % 2])
+                                   for i in range(6)])
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def export(self, url):
+        self.login()
+        response = self.client.get(url)
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_export_Quotes(self):
+        rows = self.export(get_url('/api/quotes/export/'))
+        self.assertEqual([row['message'] for row in rows], ['Test message {}'.format(i) for i in range(6)])
+
+    def test_export_Quotes_filtered(self):
+        first = Quote.objects.order_by('id').first()
+        rows = self.export(get_url('/api/quotes/export/') + '?author={}&id__gt={}'.format(self.authors[0].pk, first.pk))
+        self.assertEqual([row['message'] for row in rows], ['Test message 2', 'Test message 4'])
+
+    def test_export_Quotes_invalid_filter(self):
+        self.login()
+        response = self.client.get(get_url('/api/quotes/export/') + '?id__gt=abc')
+        overflow = self.client.get(get_url('/api/quotes/export/') + '?author=99999999999999999999999')
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(overflow.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_Authors(self):
+        rows = self.export(get_url('/api/authors/export/'))
+        self.assertEqual([row['surname'] for row in rows], ['0', '1'])
+
+    def test_export_not_authorized(self):
+        response = self.client.get(get_url('/api/quotes/export/'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BulkTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_bulk_create_Quotes(self):
+        data = [{'message': 'Test message {}'.format(i), 'author': self.author.pk} for i in range(3)]
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/'), data, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(Quote.objects.filter(author=self.author).count(), 3)
+
+    def test_bulk_create_Quotes_ndjson(self):
+        body = '{"message": "Test message 1", "author": %d}\n\n{"message": "Test message 2"}\n' % self.author.pk
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/'), body, content_type='application/x-ndjson')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Quote.objects.count(), 2)
+
+    def test_bulk_create_Quotes_with_errors(self):
+        data = [{'message': 'Test message', 'author': self.author.pk},
+                {'author': self.author.pk},
+                {'message': 'Test message', 'author': 999}]
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/'), data, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('message', response.data['errors'][0]['errors'])
+        self.assertIn('author', response.data['errors'][1]['errors'])
+        self.assertEqual(Quote.objects.count(), 1)
+
+    def test_bulk_upsert_Quotes(self):
+        Quote.objects.create(message='Test message 1', author=self.author)
+        data = [{'message': 'Test message 1', 'author': self.author.pk},
+                {'message': 'Test message 2', 'author': self.author.pk},
+                {'message': 'Test message 2', 'author': self.author.pk}]
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/') + '?upsert=true', data, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['matched']), (1, 1))
+        self.assertEqual(Quote.objects.count(), 2)
+
+    def test_bulk_create_Quotes_not_a_list(self):
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/'), {'message': 'Test message'}, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_Quotes_not_authorized(self):
+        response = self.client.post(get_url('/api/quotes/bulk/'), [{'message': 'Test message'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SchemaTestAPI(APITestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'openapi.json'
+        override = self.settings(OPENAPI_SCHEMA_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        schema_artifact.reset()
+
+    def test_schema_is_generated_once(self):
+        with mock.patch.object(schema_artifact, 'generate', wraps=schema_artifact.generate) as generate:
+            first = self.client.get('/?format=openapi')
+            second = self.client.get('/openapi/')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(generate.call_count, 1)
+        self.assertTrue(self.path.exists())
+        self.assertIn('/api/quotes/', json.loads(first.content)['paths'])
+
+    def test_ui_does_not_build_schema(self):
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema') as get_schema:
+            first = self.client.get('/', HTTP_ACCEPT='text/html,application/xhtml+xml,*/*;q=0.8')
+            second = self.client.get('/', HTTP_ACCEPT='text/html,application/xhtml+xml,*/*;q=0.8')
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first['Content-Type'], 'text/html; charset=utf-8')
+        self.assertIn(schema_artifact.info.title, second.content.decode())
+        get_schema.assert_not_called()
+
+    def test_schema_not_modified(self):
+        response = self.client.get('/?format=openapi')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get('/?format=openapi', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schema_yaml(self):
+        response = self.client.get('/openapi/?format=.yaml')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('application/yaml'))
+
+    def test_stale_schema_is_regenerated(self):
+        self.path.write_text(json.dumps({FINGERPRINT_KEY: 'stale', 'paths': {}}))
+        response = self.client.get('/openapi/', HTTP_ACCEPT='application/json')
+        self.assertIn('/api/quotes/', json.loads(response.content)['paths'])
+
+    def test_fingerprint_covers_views(self):
+        fingerprint = urlconf_fingerprint()
+        with mock.patch.object(QuoteSerializer.Meta, 'fields', ['id', 'message']):
+            self.assertNotEqual(urlconf_fingerprint(), fingerprint)
+        with mock.patch.object(AuthorAPI, '__doc__', 'Changed documentation.'):
+            self.assertNotEqual(urlconf_fingerprint(), fingerprint)
+        self.assertEqual(urlconf_fingerprint(), fingerprint)
+
+    def test_generate_schema_command(self):
+        call_command('generate_schema', stdout=io.StringIO())
+        self.assertEqual(json.loads(self.path.read_text())[FINGERPRINT_KEY], urlconf_fingerprint())
+
+
+class TokenTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.token = Token.objects.create(user=self.superuser)
+        token_cache.clear()
+
+    def authenticate(self, key):
+        request = APIRequestFactory().get('/api/quotes/', HTTP_AUTHORIZATION='Token ' + key)
+        return CachedTokenAuthentication().authenticate(request)
+
+    def test_obtain_token(self):
+        response = self.client.post(get_url('/api-token-auth/'),
+                                    {'username': SUPERUSER_NAME, 'password': SUPERUSER_PASSWORD}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], self.token.key)
+
+    def test_get_Quotes_with_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.get(get_url('/api/quotes/'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_Quotes_with_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        response = self.client.get(get_url('/api/quotes/'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_cached_token_skips_database(self):
+        self.assertEqual(self.authenticate(self.token.key)[0], self.superuser)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(self.token.key)[0], self.superuser)
+
+    def test_cached_token_expires(self):
+        self.authenticate(self.token.key)
+        with mock.patch('myApp.authentication.time.monotonic', return_value=time.monotonic() + 3600):
+            with self.assertNumQueries(1):
+                self.authenticate(self.token.key)
+
+    def test_revoke_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(get_url('/api/quotes/')).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(get_url('/api-token-auth/revoke/'))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.exists())
+        self.assertEqual(self.client.get(get_url('/api/quotes/')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user_is_evicted(self):
+        self.authenticate(self.token.key)
+        self.superuser.is_active = False
+        self.superuser.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(self.token.key)
+
+
+class SearchTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def search(self, terms, **params):
+        self.login()
+        response = self.client.get(get_url('/api/quotes/'), {'search': terms, **params}, format='json')
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def messages(self, terms):
+        return [quote['message'] for quote in self.search(terms).data['results']]
+
+    def test_search_Quotes_ranked(self):
+        Quote.objects.create(message='Life is short', author=self.author)
+        Quote.objects.create(message='Life is life, life goes on', author=self.author)
+        Quote.objects.create(message='Nothing to see here', author=self.author)
+
+        self.assertEqual(self.messages('life'), ['Life is life, life goes on', 'Life is short'])
+        self.assertEqual(self.messages('life short'), ['Life is short'])
+        self.assertEqual(self.messages('"OR*'), [])
+
+    def test_search_index_follows_writes(self):
+        self.login()
+        response = self.client.post(get_url('/api/quotes/'), {'message': 'Carpe diem', 'author': self.author.pk},
+                                    format='json')
+        quote_url = get_url('/api/quotes/{}/'.format(response.data['id']))
+        self.logout()
+        self.assertEqual(self.messages('carpe'), ['Carpe diem'])
+
+        self.login()
+        self.client.put(quote_url, {'message': 'Carpe noctem', 'author': self.author.pk}, format='json')
+        self.logout()
+        self.assertEqual(self.messages('diem'), [])
+        self.assertEqual(self.messages('noctem'), ['Carpe noctem'])
+
+        self.login()
+        self.client.delete(quote_url)
+        self.logout()
+        self.assertEqual(self.messages('carpe'), [])
+
+    def test_search_Quotes_paginated(self):
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.author) for i in range(5)])
+        response = self.search('message', page_size=2, page=3)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_search_index_is_rebuilt(self):
+        with connection.cursor() as cursor:
+            for trigger in FTS_TRIGGERS:
+                cursor.execute('DROP TRIGGER {}'.format(trigger))
+        Quote.objects.create(message='Written without triggers', author=self.author)
+        self.assertEqual(self.messages('triggers'), [])
+
+        install_fts(connection)
+        response_cache.clear()
+        self.assertEqual(self.messages('triggers'), ['Written without triggers'])
+
+
+class ConditionalTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        self.quote = Quote.objects.create(message='Test message', author=self.author)
+        self.login()
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_get_single_Quote_not_modified(self):
+        url = get_url('/api/quotes/{}/'.format(self.quote.pk))
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+
+        with mock.patch.object(QuoteSerializer, 'to_representation') as to_representation:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        to_representation.assert_not_called()
+
+    def test_get_single_Quote_modified(self):
+        url = get_url('/api/quotes/{}/'.format(self.quote.pk))
+        etag = self.client.get(url, format='json')['ETag']
+        self.quote.message = 'Test message updated'
+        self.quote.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_Author_delete_changes_Quote_etags(self):
+        detail, listing = get_url('/api/quotes/{}/'.format(self.quote.pk)), get_url('/api/quotes/')
+        etags = [self.client.get(url, format='json')['ETag'] for url in (detail, listing)]
+        self.client.delete(get_url('/api/authors/{}/'.format(self.author.pk)))
+
+        responses = [self.client.get(url, HTTP_IF_NONE_MATCH=etag) for url, etag in zip((detail, listing), etags)]
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * 2)
+        self.assertIsNone(responses[0].json()['author'])
+        self.assertIsNone(responses[1].json()['results'][0]['author'])
+
+    def test_get_Author_Quotes_not_modified(self):
+        url = get_url('/api/authors/{}/quotes/'.format(self.author.pk))
+        etag = self.client.get(url, format='json')['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Quote.objects.create(message='Test message 2', author=self.author)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_get_Authors_not_modified_after_delete(self):
+        Author.objects.create(name='Test', surname='Test 2')
+        url = get_url('/api/authors/')
+        etag = self.client.get(url, format='json')['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Author.objects.filter(surname='Test 2').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_update_single_Quote_if_match(self):
+        url = get_url('/api/quotes/{}/'.format(self.quote.pk))
+        etag = self.client.get(url, format='json')['ETag']
+        data = {'message': 'Test message updated', 'author': self.author.pk}
+
+        response = self.client.put(url, data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        response = self.client.put(url, {**data, 'message': 'Lost update'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Quote.objects.get().message, 'Test message updated')
+
+    def test_delete_Author_if_match(self):
+        url = get_url('/api/authors/{}/'.format(self.author.pk))
+        response = self.client.delete(url, HTTP_IF_MATCH='"stale"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+        response = self.client.delete(url, HTTP_IF_MATCH=self.client.get(url, format='json')['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Author.objects.count(), 0)
+
+
+class ResponseCacheTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Test', surname=str(i)) for i in range(2)]
+        self.quote = Quote.objects.create(message='Test message', author=self.authors[0])
+        self.login()
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get(self, url, **params):
+        response = self.client.get(get_url(url), params, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_list_is_served_from_cache(self):
+        first = self.get('/api/quotes/')
+        with self.assertNumQueries(2):  # session and user lookups only
+            self.assertEqual(self.get('/api/quotes/'), first)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.assertEqual(len(self.get('/api/authors/')['results']), 2)
+        self.assertEqual(len(self.get('/api/authors/', page_size=1)['results']), 1)
+
+    @override_settings(ALLOWED_HOSTS=['internal.local', 'api.example.com'])
+    def test_origin_is_part_of_the_key(self):
+        internal = self.client.get('/api/authors/', {'page_size': 1}, HTTP_HOST='internal.local').data
+        public = self.client.get('/api/authors/', {'page_size': 1}, HTTP_HOST='api.example.com', secure=True).data
+        self.assertTrue(internal['next'].startswith('http://internal.local/'))
+        self.assertTrue(public['next'].startswith('https://api.example.com/'))
+
+    def test_update_invalidates_detail_and_lists(self):
+        self.get('/api/quotes/{}/'.format(self.quote.pk))
+        self.get('/api/quotes/')
+        self.get('/api/authors/{}/quotes/'.format(self.authors[0].pk))
+
+        self.quote.message = 'Test message updated'
+        self.quote.save()
+
+        self.assertEqual(self.get('/api/quotes/{}/'.format(self.quote.pk))['message'], 'Test message updated')
+        self.assertEqual(self.get('/api/quotes/')['results'][0]['message'], 'Test message updated')
+        self.assertEqual(self.get('/api/authors/{}/quotes/'.format(self.authors[0].pk))['results'][0]['message'],
+                         'Test message updated')
+
+    def test_reassign_invalidates_both_authors(self):
+        self.get('/api/authors/{}/quotes/'.format(self.authors[0].pk))
+        self.get('/api/authors/{}/quotes/'.format(self.authors[1].pk))
+
+        self.quote.author = self.authors[1]
+        self.quote.save()
+
+        self.assertEqual(self.get('/api/authors/{}/quotes/'.format(self.authors[0].pk))['results'], [])
+        self.assertEqual(len(self.get('/api/authors/{}/quotes/'.format(self.authors[1].pk))['results']), 1)
+
+    def test_author_delete_invalidates_quotes(self):
+        self.assertEqual(self.get('/api/quotes/{}/'.format(self.quote.pk))['author'], self.authors[0].pk)
+        self.authors[0].delete()
+        self.assertIsNone(self.get('/api/quotes/{}/'.format(self.quote.pk))['author'])
+
+    def test_bulk_create_invalidates_lists(self):
+        self.get('/api/authors/{}/quotes/'.format(self.authors[1].pk))
+        self.client.post(get_url('/api/quotes/bulk/'), [{'message': 'Bulk', 'author': self.authors[1].pk}],
+                         format='json')
+        self.assertEqual(len(self.get('/api/authors/{}/quotes/'.format(self.authors[1].pk))['results']), 1)
+
+    def test_cached_response_not_modified(self):
+        url = get_url('/api/quotes/{}/'.format(self.quote.pk))
+        etag = self.client.get(url, format='json')['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class AuthorQuoteIndexTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Test', surname=str(i)) for i in range(3)]
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.authors[i % 3])
+                                   for i in range(30)])
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_get_Author_Quotes_ordered(self):
+        self.login()
+        response = self.client.get(get_url('/api/authors/{}/quotes/'.format(self.authors[1].pk)), format='json')
+        self.logout()
+
+        ids = [quote['id'] for quote in response.data['results']]
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(ids, sorted(ids))
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+    def test_get_Author_Quotes_uses_index(self):
+        self.login()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(get_url('/api/authors/{}/quotes/'.format(self.authors[1].pk)), format='json')
+        self.logout()
+
+        sql = next(query['sql'] for query in context.captured_queries if 'FROM "myApp_quote"' in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' | '.join(row[-1] for row in cursor.fetchall())
+
+        self.assertIn('USING INDEX quote_author_id_idx', plan)
+        self.assertNotIn('SCAN', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AsyncReadTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.author) for i in range(3)])
+        self.token = Token.objects.create(user=self.superuser)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_middleware_not_adapted(self):
+        # Django only logs adapted middleware in debug mode
+        with self.settings(DEBUG=True), self.assertNoLogs('django.request', 'DEBUG'):
+            ASGIHandler()
+
+    def test_async_query_timing(self):
+        client, authorization = AsyncClient(), 'Token ' + self.token.key
+        url = get_url('/api/async/quotes/')
+
+        async def fetch(count):
+            return await asyncio.gather(*[client.get(url, authorization=authorization) for _ in range(count)])
+
+        async_to_sync(fetch)(1)
+        response_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(fetch)(1)
+        response_cache.clear()
+        responses = async_to_sync(fetch)(3)
+
+        # each request counts only its own queries, although their ORM calls share a thread
+        descriptions = [response['Server-Timing'].split(',')[0].split(';')[2] for response in responses]
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(descriptions, ['desc="{} queries"'.format(len(queries))] * 3)
+
+    def test_async_Quotes_match_sync_Quotes(self):
+        self.login()
+        sync = self.client.get(get_url('/api/quotes/'), {'page_size': 2}, format='json').json()
+        response = self.client.get(get_url('/api/async/quotes/'), {'page_size': 2})
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], sync['results'])
+        self.assertIsNotNone(response.json()['next'])
+
+    def test_async_single_Author_with_token(self):
+        url = get_url('/api/async/authors/{}/'.format(self.author.pk))
+        response = self.client.get(url, HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], 'Test')
+
+    def test_async_single_Quote_not_found(self):
+        self.login()
+        response = self.client.get(get_url('/api/async/quotes/999/'))
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_Quotes_not_authorized(self):
+        response = self.client.get(get_url('/api/async/quotes/'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SQLiteTuningTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite pragmas')
+    def test_connection_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA busy_timeout')
+            busy_timeout = cursor.fetchone()[0]
+        self.assertEqual(synchronous, 1)
+        self.assertEqual(busy_timeout, settings.SQLITE_PRAGMAS['busy_timeout'])
+
+    def test_create_retries_when_locked(self):
+        save = Quote.save
+        calls = []
+
+        def flaky_save(instance, *args, **kwargs):
+            calls.append(instance)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return save(instance, *args, **kwargs)
+
+        self.login()
+        with mock.patch('myApp.db.time.sleep'), mock.patch.object(Quote, 'save', flaky_save):
+            response = self.client.post(get_url('/api/quotes/'), {'message': 'Test', 'author': self.author.pk},
+                                        format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(Quote.objects.count(), 1)
+
+    def test_update_gives_up_with_503(self):
+        quote = Quote.objects.create(message='Test', author=self.author)
+        self.login()
+        with mock.patch('myApp.db.time.sleep') as sleep, \
+                mock.patch.object(Quote, 'save', side_effect=OperationalError('database is locked')):
+            response = self.client.patch(get_url('/api/quotes/{}'.format(quote.pk)), {'message': 'New'},
+                                         format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(sleep.call_count, settings.DATABASE_LOCK_RETRIES)
+        self.assertEqual(Quote.objects.get(pk=quote.pk).message, 'Test')
+
+    def test_other_errors_are_not_retried(self):
+        self.login()
+        with mock.patch.object(Quote, 'save', side_effect=OperationalError('no such table')):
+            with self.assertRaises(OperationalError):
+                self.client.post(get_url('/api/quotes/'), {'message': 'Test', 'author': self.author.pk},
+                                 format='json')
+        self.logout()
+
+
+class SparseFieldsTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        self.quote = Quote.objects.create(message='Test message', author=self.author)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_quotes(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(get_url('/api/quotes/'), params, format='json')
+        quote_queries = [query['sql'] for query in queries.captured_queries if 'FROM "myApp_quote"' in query['sql']]
+        return response, quote_queries
+
+    def test_Quote_fields(self):
+        self.login()
+        response, queries = self.get_quotes({'fields': 'id,message'})
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], [{'id': self.quote.pk, 'message': 'Test message'}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"author_id"', queries[0])
+
+    def test_Quote_expand_author(self):
+        self.login()
+        response, queries = self.get_quotes({'expand': 'author'})
+        plain, plain_queries = self.get_quotes({})
+        self.logout()
+
+        self.assertEqual(response.json()['results'][0]['author']['name'], 'Test')
+        self.assertEqual(plain.json()['results'][0]['author'], self.author.pk)
+        self.assertIn('JOIN "myApp_author"', queries[0])
+        self.assertNotIn('JOIN "myApp_author"', plain_queries[0])
+
+    def test_Quote_fields_with_expand(self):
+        self.login()
+        with self.assertNumQueries(3):
+            response = self.client.get(get_url('/api/quotes/{}'.format(self.quote.pk)),
+                                       {'fields': 'id,author', 'expand': 'author'}, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.author.refresh_from_db()
+        self.assertEqual(response.json(), {'id': self.quote.pk, 'author': AuthorSerializer(self.author).data})
+
+    def test_expanded_Author_rename(self):
+        urls = [get_url('/api/quotes/{}/'.format(self.quote.pk)), get_url('/api/quotes/'),
+                get_url('/api/authors/{}/quotes/'.format(self.author.pk))]
+        self.login()
+        before = [self.client.get(url, {'expand': 'author'}, format='json') for url in urls]
+        self.client.patch(get_url('/api/authors/{}/'.format(self.author.pk)), {'name': 'Renamed'}, format='json')
+        after = [self.client.get(url, {'expand': 'author'}, format='json') for url in urls]
+        conditional = [self.client.get(url, {'expand': 'author'}, format='json', HTTP_IF_NONE_MATCH=response['ETag'])
+                       for url, response in zip(urls, before)]
+        self.logout()
+
+        detail, *lists = [response.json() for response in after]
+        self.assertEqual(detail['author']['name'], 'Renamed')
+        for data in lists:
+            self.assertEqual(data['results'][0]['author']['name'], 'Renamed')
+        for response in conditional:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_single_Author_fields(self):
+        self.login()
+        response = self.client.get(get_url('/api/authors/{}'.format(self.author.pk)), {'fields': 'name'},
+                                   format='json')
+        self.logout()
+        self.assertEqual(response.json(), {'name': 'Test'})
+
+    def test_unknown_fields_rejected(self):
+        self.login()
+        response = self.client.get(get_url('/api/quotes/'), {'fields': 'id,secret', 'expand': 'message'},
+                                   format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.json())
+        self.assertIn('expand', response.json())
+
+    def test_writes_ignore_fields(self):
+        self.login()
+        data = {'message': 'New', 'author': self.author.pk}
+        response = self.client.post(get_url('/api/quotes/') + '?fields=id', data, format='json')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['message'], 'New')
+
+
+class QuoteCountTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Test', surname=str(i)) for i in range(3)]
+        for author, count in zip(self.authors, (1, 3, 2)):
+            for i in range(count):
+                Quote.objects.create(message='Test message {}'.format(i), author=author)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_counts(self):
+        response = self.client.get(get_url('/api/authors/'), {'ordering': '-quote_count'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(author['id'], author['quote_count']) for author in response.json()['results']]
+
+    def assertCounts(self, expected):
+        self.login()
+        for denormalized in (False, True):
+            response_cache.clear()
+            with self.settings(AUTHOR_QUOTE_COUNT_DENORMALIZED=denormalized):
+                self.assertEqual(self.get_counts(), expected)
+        self.logout()
+
+    def test_list_Authors_ordered_by_quote_count(self):
+        a, b, c = self.authors
+        self.assertCounts([(b.pk, 3), (c.pk, 2), (a.pk, 1)])
+
+    def test_ordering_pages_through_ties(self):
+        Quote.objects.create(message='Tie', author=self.authors[0])
+        self.login()
+        url, seen = get_url('/api/authors/') + '?ordering=-quote_count&page_size=1', []
+        while url:
+            data = self.client.get(url, format='json').json()
+            seen.extend(author['id'] for author in data['results'])
+            url = data['next']
+        self.logout()
+        self.assertEqual(sorted(seen), sorted(author.pk for author in self.authors))
+
+    def test_quote_count_follows_writes(self):
+        a, b, c = self.authors
+        self.login()
+        url = get_url('/api/authors/{}'.format(a.pk))
+        first = self.client.get(url, format='json')
+        self.client.post(get_url('/api/quotes/'), {'message': 'New', 'author': a.pk}, format='json')
+        quote = Quote.objects.filter(author=b).first()
+        self.client.patch(get_url('/api/quotes/{}'.format(quote.pk)), {'author': c.pk}, format='json')
+        self.client.delete(get_url('/api/quotes/{}'.format(Quote.objects.filter(author=c).first().pk)))
+        self.client.post(get_url('/api/quotes/bulk/'), [{'message': 'Bulk', 'author': a.pk}], format='json')
+        second = self.client.get(url, format='json', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.logout()
+
+        self.assertEqual(first.json()['quote_count'], 1)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json()['quote_count'], 3)
+        self.assertCounts([(a.pk, 3), (b.pk, 2), (c.pk, 2)])
+
+    def test_quote_count_after_Author_delete(self):
+        a, b, c = self.authors
+        orphans = list(Quote.objects.filter(author=b))
+        b.delete()
+        orphans[0].author = a
+        orphans[0].save()
+        self.assertCounts([(a.pk, 2), (c.pk, 2)])
+        self.assertEqual(Quote.objects.filter(author=None).count(), 2)
+
+
+class RandomQuoteTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Test', surname=str(i)) for i in range(2)]
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.authors[i % 2])
+                                   for i in range(20)])
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_random(self, params=None):
+        return self.client.get(get_url('/api/quotes/random/'), params or {}, format='json')
+
+    def test_random_Quote(self):
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_random()
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(Quote.objects.filter(pk=response.json()['id']).exists())
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertFalse(any('RANDOM()' in query['sql'] for query in queries.captured_queries))
+
+    def test_random_Quote_of_Author(self):
+        self.login()
+        authors = {self.get_random({'author': self.authors[1].pk}).json()['author'] for _ in range(10)}
+        self.logout()
+        self.assertEqual(authors, {self.authors[1].pk})
+
+    def test_random_Quote_sparse_ids(self):
+        keep = Quote.objects.order_by('id')[5]
+        Quote.objects.exclude(pk=keep.pk).delete()
+        self.login()
+        with mock.patch('myApp.sampling.random.randint', return_value=0):
+            response = self.get_random()
+        self.logout()
+        self.assertEqual(response.json()['id'], keep.pk)
+
+    def test_random_Quote_not_found(self):
+        self.login()
+        missing = self.get_random({'author': 999})
+        invalid = [self.get_random({'author': author}) for author in ('x', '\u00b2', '9' * 23)]
+        self.logout()
+        self.assertEqual(missing.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual([response.status_code for response in invalid], [status.HTTP_400_BAD_REQUEST] * 3)
+
+
+class ThrottleTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        self.rates = {'user': '100/minute', 'quotes-write': '3/minute', 'author-quotes-read': '2/minute'}
+        patcher = mock.patch.object(SlidingWindowThrottle, 'THROTTLE_RATES', self.rates)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_Quote_writes_throttled(self):
+        self.login()
+        responses = [self.client.post(get_url('/api/quotes/'), {'message': 'Test', 'author': self.author.pk},
+                                      format='json') for _ in range(4)]
+        read = self.client.get(get_url('/api/quotes/'), format='json')
+        self.logout()
+
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_201_CREATED] * 3 +
+                         [status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertGreater(int(responses[-1]['Retry-After']), 0)
+        self.assertEqual(read.status_code, status.HTTP_200_OK)
+        self.assertEqual(Quote.objects.count(), 3)
+
+    def test_Author_Quotes_reads_throttled(self):
+        url = get_url('/api/authors/{}/quotes'.format(self.author.pk))
+        self.login()
+        codes = [self.client.get(url, format='json').status_code for _ in range(3)]
+        other = self.client.get(get_url('/api/quotes/'), format='json')
+        self.logout()
+
+        self.assertEqual(codes, [status.HTTP_200_OK] * 2 + [status.HTTP_429_TOO_MANY_REQUESTS])
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_async_reads_throttled(self):
+        self.rates['user'] = '2/minute'
+        self.login()
+        codes = [self.client.get(get_url('/api/async/quotes/')).status_code for _ in range(2)]
+        throttled = self.client.get(get_url('/api/async/authors/'))
+        self.logout()
+
+        self.assertEqual(codes, [status.HTTP_200_OK] * 2)
+        self.assertEqual(throttled.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(throttled['Retry-After']), 0)
+
+    def test_sliding_window(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.superuser
+        throttle = type('TestThrottle', (SlidingWindowThrottle,), {
+            'rate': '10/minute', 'get_cache_key': lambda self, request, view: 'test'})()
+
+        with mock.patch.object(throttle, 'timer', return_value=6000 + 50):
+            allowed = [throttle.allow_request(request, None) for _ in range(12)]
+        self.assertEqual(allowed, [True] * 10 + [False] * 2)
+        # a quarter into the next window, 3/4 of the previous one still counts: 10 * 0.75 = 7.5 of 10
+        with mock.patch.object(throttle, 'timer', return_value=6060 + 15):
+            allowed = [throttle.allow_request(request, None) for _ in range(3)]
+            self.assertAlmostEqual(throttle.wait(), 3)
+        self.assertEqual(allowed, [True, True, False])
+
+
+class TimingTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        Quote.objects.create(message='Test message', author=self.author)
+        metrics.reset()
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_server_timing_header(self):
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(get_url('/api/authors/{}/quotes'.format(self.author.pk)), format='json')
+        self.logout()
+
+        timings = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertEqual(set(timings), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="{} queries"'.format(len(queries)), timings['db'])
+
+    def test_metrics(self):
+        self.login()
+        self.client.get(get_url('/api/quotes/'), format='json')
+        self.client.get(get_url('/api/quotes/999'), format='json')
+        response = self.client.get('/metrics')
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('myapp_requests_total{view="quote-list",method="GET",status="200"} 1', body)
+        self.assertIn('myapp_requests_total{view="quote-detail",method="GET",status="404"} 1', body)
+        self.assertIn('myapp_request_duration_seconds_bucket{view="quote-list",le="+Inf"} 1', body)
+        self.assertIn('myapp_sql_queries_total{view="quote-list"}', body)
+        self.assertIn('myapp_serialize_duration_seconds_total{view="quote-list"}', body)
+
+    def test_serialize_timing(self):
+        self.login()
+        with mock.patch.object(QuoteSerializer, 'to_representation', side_effect=lambda quote: time.sleep(0.05) or {}):
+            response = self.client.get(get_url('/api/quotes/{}/'.format(Quote.objects.get().pk)), format='json')
+        self.logout()
+        timings = dict(part.strip().split(';', 1) for part in response['Server-Timing'].split(','))
+        self.assertGreaterEqual(float(timings['serialize'].split('=')[1]), 50)
+
+    def test_metrics_restricted(self):
+        user = User.objects.create_user('user', 'user@example.com', 'password')
+        anonymous = self.client.get('/metrics')
+        self.client.force_login(user)
+        regular = self.client.get('/metrics')
+        self.client.logout()
+        with self.settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            allowed = self.client.get('/metrics')
+
+        self.assertEqual(anonymous.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(regular.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(allowed.status_code, status.HTTP_200_OK)
+
+    def test_slow_request_log(self):
+        self.login()
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0), self.assertLogs('myApp.performance', 'WARNING') as logs:
+            self.client.get(get_url('/api/authors/'), format='json')
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=None), mock.patch('myApp.middleware.logger') as logger:
+            self.client.get(get_url('/api/authors/'), format='json')
+        self.logout()
+
+        self.assertIn('GET /api/authors/', logs.output[0])
+        logger.warning.assert_not_called()
+
+
+class BenchmarkTestAPI(APITestCase):
+    def test_routes_cover_urls(self):
+        names = {name for name in get_resolver('myApp.urls').reverse_dict if isinstance(name, str)}
+        self.assertEqual({route.name for route in ROUTES}, names)
+
+    def test_benchmark_suite(self):
+        seed_quotes(60, 3)
+
+        results = BenchmarkSuite(requests=2, warmup=0).run()
+
+        self.assertEqual(list(results), [route.label for route in ROUTES])
+        self.assertEqual(results['quote-list']['queries'], 1)
+        self.assertEqual(Quote.objects.count(), 60)
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertFalse(Change.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+    def test_compare(self):
+        baseline = {'quote-list': {'p50': 5, 'p95': 10, 'p99': 12, 'queries': 1}}
+        self.assertEqual(compare({'quote-list': {'p50': 6, 'p95': 14, 'p99': 20, 'queries': 1}}, baseline), [])
+        self.assertEqual(len(compare({'quote-list': {'p50': 6, 'p95': 30, 'p99': 40, 'queries': 101}}, baseline)), 2)
+        self.assertEqual(compare({'quote-random': {'p50': 6, 'p95': 30, 'p99': 40, 'queries': 2}}, baseline), [])
+
+
+class SeedQuotesTestAPI(APITestCase):
+    def seed(self, **options):
+        call_command('seed_quotes', stdout=io.StringIO(), **options)
+
+    def test_seed_quotes(self):
+        self.seed(quotes=500, authors=10, batch_size=40, transaction_size=200)
+
+        counts = list(Author.objects.order_by('-cached_quote_count').values_list('cached_quote_count', flat=True))
+        self.assertEqual(Quote.objects.count(), 500)
+        self.assertEqual(sum(counts), 500)
+        self.assertEqual(Author.objects.with_quote_count().filter(quote_count=F('cached_quote_count')).count(), 10)
+        # 1/k skew: the busiest author has about a third of the quotes
+        self.assertGreater(counts[0], 3 * counts[-1])
+
+    def test_seed_quotes_uniform(self):
+        self.seed(quotes=2000, authors=4, zipf=0, mean_words=5, length_spread=0)
+        counts = Author.objects.values_list('cached_quote_count', flat=True)
+        self.assertTrue(all(400 < count < 600 for count in counts))
+        self.assertEqual({len(message.split()) for message in Quote.objects.values_list('message', flat=True)}, {5})
+
+    def test_seed_quotes_is_repeatable(self):
+        self.seed(quotes=50, authors=3, seed=7)
+        first = list(Quote.objects.order_by('id').values_list('message', flat=True))
+        Quote.objects.all().delete()
+        self.seed(quotes=50, authors=3, seed=7)
+        self.assertEqual(list(Quote.objects.order_by('id').values_list('message', flat=True)), first)
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite FTS5')
+    def test_seeded_quotes_are_searchable(self):
+        self.seed(quotes=200, authors=2)
+        message = Quote.objects.order_by('?').values_list('message', flat=True).first()
+        self.assertTrue(Quote.objects.filter(pk__in=search_quotes(Quote.objects.all(), message)).exists())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            self.assertTrue(set(FTS_TRIGGERS) <= {row[0] for row in cursor.fetchall()})
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class BatchTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        self.quotes = [Quote.objects.create(message='Test message {}'.format(i), author=self.author)
+                       for i in range(5)]
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_batch(self, resource, ids):
+        return self.client.get(get_url('/api/{}/batch'.format(resource)), {'ids': ids}, format='json')
+
+    def test_batch_Quotes(self):
+        ids = [self.quotes[3].pk, 999, self.quotes[0].pk, self.quotes[3].pk]
+        self.login()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_batch('quotes', ','.join(map(str, ids)))
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([quote['id'] for quote in response.json()['results']], [self.quotes[3].pk, self.quotes[0].pk])
+        self.assertEqual(response.json()['missing'], [999])
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if 'FROM "myApp_quote"' in query['sql']]), 1)
+
+    def test_batch_Authors_with_fields(self):
+        self.login()
+        params = {'ids': str(self.author.pk), 'fields': 'id,quote_count'}
+        response = self.client.get(get_url('/api/authors/batch'), params, format='json')
+        self.logout()
+        self.assertEqual(response.json(), {'results': [{'id': self.author.pk, 'quote_count': 5}], 'missing': []})
+
+    def test_batch_invalid_ids(self):
+        self.login()
+        cases = ('', '1,x', ','.join(['1'] * 101), '\u00b2', '1,99999999999999999999999')
+        responses = [self.get_batch('quotes', ids) for ids in cases]
+        self.logout()
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_400_BAD_REQUEST] * 5)
+
+    def test_batch_not_authorized(self):
+        response = self.get_batch('quotes', str(self.quotes[0].pk))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RendererTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        self.quote = Quote.objects.create(message='Čast \u2028 "quoted" 💬', author=self.author)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def test_fast_json_matches_stdlib(self):
+        data = {'results': [{'price': Decimal('1.50'), 'at': datetime.datetime(2021, 1, 2, 3, 4, 5)}],
+                'quote': QuoteSerializer(self.quote).data}
+        expected = JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), expected)
+        with mock.patch('myApp.renderers.orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data), expected)
+
+    def test_json_responses(self):
+        self.login()
+        compact = self.client.get(get_url('/api/quotes/{}'.format(self.quote.pk)), HTTP_ACCEPT='application/json')
+        indented = self.client.get(get_url('/api/quotes/{}'.format(self.quote.pk)),
+                                   HTTP_ACCEPT='application/json; indent=2')
+        self.logout()
+
+        self.assertEqual(compact['Content-Type'], 'application/json')
+        self.assertEqual(compact.content, JSONRenderer().render(QuoteSerializer(self.quote).data))
+        self.assertEqual(json.loads(indented.content), json.loads(compact.content))
+        self.assertIn(b'\n  "id"', indented.content)
+        self.assertNotEqual(indented['ETag'], compact['ETag'])
+
+    def test_invalid_json_body(self):
+        self.login()
+        response = self.client.post(get_url('/api/quotes/'), '{"message": ', content_type='application/json')
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @skipUnless(renderers.msgpack is not None, 'msgpack is not installed')
+    def test_msgpack(self):
+        self.login()
+        body = renderers.msgpack.packb({'message': 'Packed', 'author': self.author.pk})
+        created = self.client.post(get_url('/api/quotes/'), body, content_type='application/msgpack',
+                                   HTTP_ACCEPT='application/msgpack')
+        listed = self.client.get(get_url('/api/quotes/'), HTTP_ACCEPT='application/msgpack')
+        self.logout()
+
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(renderers.msgpack.unpackb(created.content)['message'], 'Packed')
+        self.assertEqual(listed['Content-Type'], 'application/msgpack')
+        self.assertEqual(len(renderers.msgpack.unpackb(listed.content)['results']), 2)
+
+    def test_benchmark_renderers(self):
+        output = io.StringIO()
+        call_command('benchmark_renderers', quotes=10, repeat=1, stdout=output)
+        self.assertIn('json (stdlib)', output.getvalue())
+
+
+class CompressionTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+        Quote.objects.bulk_create([Quote(message='Test message {}'.format(i), author=self.author) for i in range(50)])
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_quotes(self, accept_encoding, **params):
+        return self.client.get(get_url('/api/quotes/'), params, HTTP_ACCEPT_ENCODING=accept_encoding,
+                               HTTP_ACCEPT='application/json')
+
+    def test_gzip_list(self):
+        self.login()
+        plain = self.get_quotes('')
+        response = self.get_quotes('br;q=0.9, gzip')
+        self.logout()
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(response['ETag'], plain['ETag'][:-1] + '-gzip"')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+
+    def test_gzip_etag_preconditions(self):
+        quote = Quote.objects.create(message='Test message ' * 250, author=self.author)
+        url = get_url('/api/quotes/{}/'.format(quote.pk))
+        self.login()
+        etag = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_ACCEPT='application/json')['ETag']
+        not_modified = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        response = self.client.patch(url, {'message': 'Test message updated'}, format='json', HTTP_IF_MATCH=etag)
+        stale = self.client.patch(url, {'message': 'Test message'}, format='json', HTTP_IF_MATCH=etag)
+        self.logout()
+
+        self.assertTrue(etag.endswith('-gzip"'))
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_not_compressed(self):
+        self.login()
+        small = self.get_quotes('gzip', page_size=1)
+        refused = self.get_quotes('gzip;q=0, identity')
+        self.logout()
+        self.assertFalse(small.has_header('Content-Encoding'))
+        self.assertFalse(refused.has_header('Content-Encoding'))
+
+    def test_compressed_once(self):
+        self.login()
+        with mock.patch('myApp.compression.gzip.compress', wraps=gzip.compress) as compress:
+            first = self.get_quotes('gzip')
+            second = self.get_quotes('gzip')
+        self.logout()
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+    def test_only_reusable_bodies_kept(self):
+        ids = ','.join(str(pk) for pk in Quote.objects.values_list('pk', flat=True))
+        self.login()
+        with mock.patch('myApp.compression.gzip.compress', wraps=gzip.compress) as compress:
+            batches = [self.client.get(get_url('/api/quotes/batch'), {'ids': ids}, HTTP_ACCEPT_ENCODING='gzip',
+                                       HTTP_ACCEPT='application/json') for _ in range(2)]
+            docs = [self.client.get('/docs/', HTTP_ACCEPT_ENCODING='gzip') for _ in range(2)]
+        self.logout()
+        self.assertEqual([response['Content-Encoding'] for response in batches + docs], ['gzip'] * 4)
+        # the batch has no ETag and isn't cached, so it is compressed every time; the docs page only once
+        self.assertEqual(compress.call_count, 3)
+
+    def test_schema_and_docs_compressed(self):
+        schema = self.client.get('/openapi/', HTTP_ACCEPT='application/json', HTTP_ACCEPT_ENCODING='gzip')
+        docs = self.client.get('/docs/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(schema['Content-Encoding'], 'gzip')
+        self.assertIn('paths', json.loads(gzip.decompress(schema.content)))
+        self.assertEqual(docs['Content-Encoding'], 'gzip')
+
+    def test_export_streamed_gzip(self):
+        self.login()
+        response = self.client.get(get_url('/api/quotes/export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.logout()
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(lines), 50)
+
+    def test_csrf_pages_not_compressed(self):
+        self.login()
+        page = self.client.get(get_url('/api/quotes/'), {'search': 'Test message'}, HTTP_ACCEPT='text/html',
+                               HTTP_ACCEPT_ENCODING='gzip')
+        self.logout()
+        self.assertEqual(page.status_code, status.HTTP_200_OK)
+        self.assertIn(b'csrfmiddlewaretoken', page.content)
+        self.assertFalse(page.has_header('Content-Encoding'))
+
+    def test_choose_encoding(self):
+        available = ['br', 'zstd', 'gzip']
+        self.assertEqual(choose_encoding('gzip, deflate, br', available), 'br')
+        self.assertEqual(choose_encoding('gzip;q=1.0, br;q=0.5', available), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0.1, br;q=0', available), 'zstd')
+        self.assertIsNone(choose_encoding('identity', available))
+        self.assertIsNone(choose_encoding('', available))
+
+
+class ValuesListTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.authors = [Author.objects.create(name='Name {}'.format(i), surname='Surname') for i in range(3)]
+        for index, author in enumerate(self.authors):
+            for i in range(index + 1):
+                Quote.objects.create(message='Famous words {} {}'.format(index, i), author=author)
+        Quote.objects.create(message='Famous words without an author', author=None)
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def assertSameAsSerializer(self, url, params):
+        response_cache.clear()
+        fast = self.client.get(get_url(url), params, format='json')
+        response_cache.clear()
+        with self.settings(LIST_FROM_VALUES=False):
+            slow = self.client.get(get_url(url), params, format='json')
+        self.assertEqual(fast.status_code, status.HTTP_200_OK)
+        self.assertEqual(fast.content, slow.content)
+        self.assertEqual(fast['ETag'], slow['ETag'])
+
+    def test_Quote_list_parity(self):
+        self.login()
+        for params in [{}, {'fields': 'id,message'}, {'expand': 'author'},
+                       {'fields': 'message,author', 'expand': 'author'}, {'search': 'famous words'}, {'page_size': 2}]:
+            with self.subTest(params=params):
+                self.assertSameAsSerializer('/api/quotes/', params)
+        self.logout()
+
+    def test_Author_list_parity(self):
+        self.login()
+        for params in [{}, {'fields': 'id,quote_count'}, {'ordering': '-quote_count'},
+                       {'ordering': 'name', 'fields': 'id', 'page_size': 2}]:
+            with self.subTest(params=params):
+                self.assertSameAsSerializer('/api/authors/', params)
+        with self.settings(AUTHOR_QUOTE_COUNT_DENORMALIZED=True):
+            self.assertSameAsSerializer('/api/authors/', {'ordering': '-quote_count'})
+        self.logout()
+
+    def test_row_mappings_cleared_concurrently(self):
+        class ClearedByAnotherThread(dict):
+            def __setitem__(self, key, value):
+                super().__setitem__(key, value)
+                self.clear()
+
+        self.login()
+        with mock.patch('myApp.mixins.ValuesListMixin.row_mappings', ClearedByAnotherThread()):
+            response = self.client.get(get_url('/api/quotes/'), format='json')
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), Quote.objects.count())
+
+    def test_list_reads_values(self):
+        self.login()
+        with mock.patch.object(QuoteSerializer, 'to_representation') as to_representation:
+            response = self.client.get(get_url('/api/quotes/'), {'expand': 'author'}, format='json')
+        self.logout()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), 7)
+        to_representation.assert_not_called()
+
+    def test_RowMapping_parity(self):
+        rows = Quote.objects.order_by('id')
+        mapping = RowMapping.compile(QuoteSerializer())
+        self.assertEqual(mapping.represent(rows.values(*mapping.columns)), QuoteSerializer(rows, many=True).data)
+
+        authors = Author.objects.with_quote_count().order_by('id')
+        mapping = RowMapping.compile(AuthorSerializer(), authors.query.annotations)
+        self.assertEqual(mapping.represent(authors.values(*mapping.columns)), AuthorSerializer(authors, many=True).data)
+
+    def test_RowMapping_unsupported_field(self):
+        class AuthorNameSerializer(QuoteSerializer):
+            author_name = serializers.CharField(source='author.name')
+
+        self.assertIsNone(RowMapping.compile(AuthorNameSerializer()))
+
+
+class ChangeFeedTestAPI(APITestCase):
+    def setUp(self) -> None:
+        self.superuser = User.objects.create_superuser(SUPERUSER_NAME, SUPERUSER_EMAIL, SUPERUSER_PASSWORD)
+        self.author = Author.objects.create(name='Test', surname='Test')
+
+    def login(self):
+        self.client.login(username=SUPERUSER_NAME, password=SUPERUSER_PASSWORD)
+
+    def logout(self):
+        self.client.logout()
+
+    def get_changes(self, **params):
+        response = self.client.get(get_url('/api/changes/'), params, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_Quote_writes_are_logged(self):
+        self.login()
+        quote = self.client.post(get_url('/api/quotes/'), {'message': 'First', 'author': self.author.pk},
+                                 format='json').json()
+        self.client.patch(get_url('/api/quotes/{}/'.format(quote['id'])), {'message': 'Second'}, format='json')
+        self.client.delete(get_url('/api/quotes/{}/'.format(quote['id'])))
+        changes = self.get_changes(since=0)
+        self.logout()
+
+        results = changes['results']
+        self.assertEqual([(change['resource'], change['object_id'], change['action']) for change in results],
+                         [('quote', quote['id'], 'created'), ('author', self.author.pk, 'updated'),
+                          ('quote', quote['id'], 'updated'), ('quote', quote['id'], 'deleted'),
+                          ('author', self.author.pk, 'updated')])
+        self.assertEqual(results[0]['data'], quote)
+        self.assertEqual(results[1]['data']['quote_count'], 1)
+        self.assertEqual(results[2]['data']['message'], 'Second')
+        self.assertIsNone(results[3]['data'])
+        self.assertEqual(results[4]['data']['quote_count'], 0)
+        self.assertEqual(changes['last'], results[-1]['seq'])
+        self.assertIsNone(changes['next'])
+
+    def test_only_deltas(self):
+        self.login()
+        self.client.post(get_url('/api/quotes/'), {'message': 'First', 'author': self.author.pk}, format='json')
+        last = self.get_changes(since=0)['last']
+        empty = self.get_changes(since=last)
+        self.client.post(get_url('/api/authors/{}/quotes/'.format(self.author.pk)),
+                         {'message': 'Second', 'author': self.author.pk}, format='json')
+        delta = self.get_changes(since=last, resource='quote')
+        self.logout()
+
+        self.assertEqual(empty, {'last': last, 'next': None, 'results': []})
+        self.assertEqual([change['data']['message'] for change in delta['results']], ['Second'])
+
+    def test_failed_writes_are_not_logged(self):
+        quote = Quote.objects.create(message='Test', author=self.author)
+        self.login()
+        invalid = self.client.post(get_url('/api/quotes/'), {'author': self.author.pk}, format='json')
+        stale = self.client.patch(get_url('/api/quotes/{}/'.format(quote.pk)), {'message': 'Changed'},
+                                  format='json', HTTP_IF_MATCH='"stale"')
+        changes = self.get_changes(since=0)
+        self.logout()
+
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(changes['results'], [])
+
+    def test_Author_delete_logs_orphaned_Quotes(self):
+        quote = Quote.objects.create(message='Test', author=self.author)
+        self.login()
+        self.client.patch(get_url('/api/authors/{}/'.format(self.author.pk)), {'name': 'Changed'}, format='json')
+        self.client.delete(get_url('/api/authors/{}/'.format(self.author.pk)))
+        changes = self.get_changes(since=0)['results']
+        self.logout()
+
+        self.assertEqual([(change['resource'], change['action']) for change in changes],
+                         [('author', 'updated'), ('author', 'deleted'), ('quote', 'updated')])
+        self.assertEqual(changes[0]['data']['name'], 'Changed')
+        self.assertEqual(changes[2]['object_id'], quote.pk)
+        self.assertIsNone(changes[2]['data']['author'])
+
+    def test_Quote_move_logs_both_Authors(self):
+        other = Author.objects.create(name='Other', surname='Other')
+        quote = Quote.objects.create(message='Test', author=self.author)
+        self.login()
+        self.client.patch(get_url('/api/quotes/{}/'.format(quote.pk)), {'author': other.pk}, format='json')
+        changes = self.get_changes(since=0)['results']
+        self.logout()
+
+        self.assertEqual([(change['resource'], change['object_id']) for change in changes],
+                         [('quote', quote.pk), ('author', self.author.pk), ('author', other.pk)])
+        self.assertEqual([change['data']['quote_count'] for change in changes[1:]], [0, 1])
+
+    def test_bulk_writes_are_logged(self):
+        existing = Quote.objects.create(message='Existing', author=self.author)
+        self.login()
+        response = self.client.post(get_url('/api/quotes/bulk/') + '?upsert=true', [
+            {'message': 'Existing', 'author': self.author.pk},
+            {'message': 'New one', 'author': self.author.pk},
+            {'message': 'New two', 'author': self.author.pk},
+        ], format='json')
+        changes = self.get_changes(since=0)['results']
+        self.logout()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['matched'], 1)
+        # the matched quote has nothing outside its natural key to update, so it isn't logged
+        self.assertNotIn(existing.pk, [change['object_id'] for change in changes if change['resource'] == 'quote'])
+        self.assertEqual([(change['resource'], change['action']) for change in changes],
+                         [('quote', 'created'), ('quote', 'created'), ('author', 'updated')])
+        self.assertEqual([change['data']['message'] for change in changes[:2]], ['New one', 'New two'])
+        self.assertEqual(changes[2]['data']['quote_count'], 3)
+
+    def test_pages_and_filters(self):
+        Quote.objects.create(message='Test', author=self.author)
+        Change.objects.record('quote', Change.CREATED, [(pk, None) for pk in range(1, 4)])
+        Change.objects.record('author', Change.CREATED, [(self.author.pk, None)])
+        self.login()
+        first = self.get_changes(since=0, page_size=2)
+        second = self.client.get(first['next'], format='json').json()
+        authors = self.get_changes(since=0, resource='author')
+        bad_since = self.client.get(get_url('/api/changes/'), {'since': 'x'}, format='json')
+        bad_resource = self.client.get(get_url('/api/changes/'), {'resource': 'user'}, format='json')
+        self.logout()
+
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual([change['object_id'] for change in second['results']], [3, self.author.pk])
+        self.assertEqual(second['last'], authors['last'])
+        self.assertEqual(len(authors['results']), 1)
+        self.assertEqual(bad_since.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(bad_resource.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_Changes_not_authorized(self):
+        response = self.client.get(get_url('/api/changes/'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(CHANGE_STREAM_TIMEOUT=0)
+    def test_stream(self):
+        Change.objects.record('quote', Change.CREATED, [(1, {'id': 1}), (2, {'id': 2})])
+        first, second = Change.objects.order_by('pk')
+        self.login()
+        response = self.client.get(get_url('/api/changes/stream/'), {'since': 0}, HTTP_ACCEPT='text/event-stream',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        resumed = self.client.get(get_url('/api/changes/stream/'), HTTP_LAST_EVENT_ID=str(first.pk))
+        latest = self.client.get(get_url('/api/changes/stream/'))
+        self.logout()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: 1000\n\n'))
+        self.assertIn('id: {}\nevent: created\ndata: '.format(first.pk), body)
+        event = body.split('\n\n')[2].split('\n')
+        self.assertEqual(json.loads(event[2][len('data: '):])['data'], {'id': 2})
+        resumed_body = b''.join(resumed.streaming_content).decode()
+        self.assertNotIn('id: {}\n'.format(first.pk), resumed_body)
+        self.assertIn('id: {}\n'.format(second.pk), resumed_body)
+        self.assertEqual(b''.join(latest.streaming_content), b'retry: 1000\n\n')
+
+    @override_settings(CHANGE_STREAM_TIMEOUT=0)
+    def test_since_out_of_range(self):
+        Change.objects.record('quote', Change.CREATED, [(1, {'id': 1})])
+        since = '9' * 23
+        self.login()
+        changes = self.get_changes(since=since)
+        stream = self.client.get(get_url('/api/changes/stream/'), {'since': since}, HTTP_ACCEPT='text/event-stream')
+        self.logout()
+
+        self.assertEqual(changes['results'], [])
+        self.assertEqual(changes['last'], SincePagination.max_since)
+        self.assertEqual(b''.join(stream.streaming_content), b'retry: 1000\n\n')
+
+    def test_stream_not_authorized(self):
+        response = self.client.get(get_url('/api/changes/stream/'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(response.content.startswith(b'event: error\ndata: '))
+
+    def test_asgi_stream_stops_on_disconnect(self):
+        fetched = []
+
+        def fetch(since):
+            fetched.append(since)
+            return [(since + 1, 'created', {'seq': since + 1})] if since < 2 else []
+
+        async def receive():
+            await asyncio.sleep(0.2)
+            return {'type': 'http.disconnect'}
+
+        async def serve():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            current_receive.set(receive)
+            response = EventStreamResponse(EventStream(fetch, 0, poll_interval=0.01, timeout=60))
+            await StreamingASGIHandler().send_response(response, send)
+            return messages
+
+        messages = async_to_sync(serve)()
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertIn((b'Content-Type', b'text/event-stream'), messages[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        self.assertIn(b'id: 1\nevent: created\n', body)
+        self.assertIn(b'id: 2\nevent: created\n', body)
+        self.assertEqual(messages[-1], {'type': 'http.response.body'})
+        self.assertGreater(len(fetched), 2)
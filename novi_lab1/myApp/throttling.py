@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Sliding-window counter kept in the `THROTTLE_CACHE_ALIAS` cache.
+
+    Requests are counted per fixed window with `cache.incr`, which is atomic on shared backends such as
+    Redis or Memcached, so every worker process draws from the same budget. The rate over the last full
+    period is estimated as the current window's count plus the previous window's count weighted by how
+    much of it the sliding period still covers. A rejected request gives its increment back, and `wait()`
+    tells the client when the estimate will drop under the limit again (sent as `Retry-After`).
+    """
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        current_key = '{}:{}'.format(self.key, window)
+        self.cache.add(current_key, 0, timeout=2 * self.duration)
+        self.current = self.cache.incr(current_key)
+        self.previous = self.cache.get('{}:{}'.format(self.key, window - 1), 0)
+
+        if self.estimate() > self.num_requests:
+            self.cache.decr(current_key)
+            self.current -= 1
+            return False
+        return True
+
+    def estimate(self):
+        return self.previous * (1 - self.elapsed / self.duration) + self.current
+
+    def wait(self):
+        # time until one more request fits: (previous * weight + current + 1) <= num_requests
+        allowed = self.num_requests - self.current - 1
+        if allowed >= 0:
+            return max(self.duration * (1 - allowed / self.previous) - self.elapsed, 0)
+        # the current window alone is over budget, so it has to become the previous window first
+        return self.duration - self.elapsed + self.duration * (1 - (self.num_requests - 1) / self.current)
+
+
+class UserSlidingThrottle(SlidingWindowThrottle):
+    """
+    Overall budget per authenticated user, or per client IP for anonymous requests.
+    """
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class ScopedSlidingThrottle(UserSlidingThrottle):
+    """
+    Per-user budget for one kind of request on one endpoint. Views map `read` (safe methods) and/or
+    `write` to a rate scope in `throttle_scopes`; requests of a kind without a scope are not limited here.
+    """
+
+    def __init__(self):
+        # the scope, and so the rate, is only known once the view is
+        pass
+
+    def allow_request(self, request, view):
+        kind = 'read' if request.method in SAFE_METHODS else 'write'
+        self.scope = getattr(view, 'throttle_scopes', {}).get(kind)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
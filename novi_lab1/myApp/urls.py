@@ -1,11 +1,13 @@
 from rest_framework_nested.routers import NestedSimpleRouter, DefaultRouter
 from django.conf.urls import url, include
 
-from .views import AuthorAPI, QuoteAPI, AuthorQuoteAPI
+from . import async_views
+from .views import AuthorAPI, ChangeAPI, QuoteAPI, AuthorQuoteAPI
 
 router = DefaultRouter()
 router.register(r'quotes', QuoteAPI)
 router.register(r'authors', AuthorAPI)
+router.register(r'changes', ChangeAPI)
 
 authors_router = NestedSimpleRouter(router, r'authors', lookup='author')
 authors_router.register(r'quotes', AuthorQuoteAPI, basename='author-quotes')
@@ -14,4 +16,8 @@ authors_router.register(r'quotes', AuthorQuoteAPI, basename='author-quotes')
 urlpatterns = [
     url(r'^', include(router.urls)),
     url(r'^', include(authors_router.urls)),
+    url(r'^async/authors/$', async_views.author_list, name='async-author-list'),
+    url(r'^async/authors/(?P<pk>[0-9]+)/$', async_views.author_detail, name='async-author-detail'),
+    url(r'^async/quotes/$', async_views.quote_list, name='async-quote-list'),
+    url(r'^async/quotes/(?P<pk>[0-9]+)/$', async_views.quote_detail, name='async-quote-detail'),
 ]
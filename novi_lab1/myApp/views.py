@@ -1,16 +1,41 @@
-from rest_framework import viewsets
+from collections import Counter
 
-from .serializers import AuthorSerializer, QuoteSerializer
-from .models import Author, Quote
+from django.conf import settings
+from django.db.models import Max
+from rest_framework import mixins, status, viewsets
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from .cache import CachedResponseMixin, response_cache
+from .db import RetryOnLockMixin, to_python_in_range
+from .filters import QuoteSearchFilter, StableOrderingFilter
+from .mixins import (BatchMixin, BulkCreateMixin, ChangeLogMixin, ConditionalMixin, ExportMixin,
+                     SparseQuerysetMixin, ValuesListMixin)
+from .pagination import SearchPagination, SincePagination
+from .renderers import EventStreamRenderer
+from .sampling import random_row
+from .serializers import AuthorSerializer, ChangeSerializer, QuoteSerializer
+from .streaming import EventStream, EventStreamResponse
+from .models import Author, Change, Quote
 
-class AuthorAPI(viewsets.ModelViewSet):
+
+class AuthorAPI(RetryOnLockMixin, ChangeLogMixin, CachedResponseMixin, ValuesListMixin, ConditionalMixin,
+                SparseQuerysetMixin, BatchMixin, ExportMixin, viewsets.ModelViewSet):
     """
     retrieve:
-        Return an author instance with their information (name and surname).
+        Return an author instance with their information (name and surname). Use `fields` to return only
+        some of the fields, e.g. `fields=id,name`.
 
     list:
-        Return all authors.
+        Return authors one page at a time, ordered by id. Follow the `next` and `previous` cursors to move
+        between pages and use `page_size` to change the number of authors per page. Use `fields` to return
+        only some of the fields and `ordering` to sort by `name`, `surname` or `quote_count`, e.g.
+        `ordering=-quote_count`.
 
     create:
         Create a new author.
@@ -23,18 +48,55 @@ class AuthorAPI(viewsets.ModelViewSet):
 
     update:
         Update an author.
+
+    export:
+        Stream all authors as newline-delimited JSON, one author per line. Accepts the `name`, `surname`,
+        `id__gt` and `id__lt` filters.
+
+    batch:
+        Return the authors with the given `ids` (comma separated, at most 100) in the same order. Ids that
+        don't exist are listed under `missing`.
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
+    filter_backends = [StableOrderingFilter]
+    ordering_fields = ('id', 'name', 'surname', 'quote_count')
+    ordering = ('id',)
+    export_filters = ('name', 'surname', 'id__gt', 'id__lt')
+    change_resource = 'author'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            queryset = queryset.with_quote_count()
+        return queryset
+
+    def perform_destroy(self, instance):
+        quote_ids = list(instance.quote_set.values_list('pk', flat=True))
+        super().perform_destroy(instance)
+        # on_delete=SET_NULL cleared the author of their quotes
+        quotes = Quote.objects.filter(pk__in=quote_ids).order_by('pk')
+        data = QuoteSerializer(quotes, many=True, context=self.get_serializer_context()).data
+        Change.objects.record('quote', Change.UPDATED, zip(quote_ids, data))
 
+    def get_cache_namespaces(self):
+        if self.action == 'retrieve':
+            return ['author:' + self.get_cache_pk('pk')]
+        return ['authors']
 
-class QuoteAPI(viewsets.ModelViewSet):
+
+class QuoteAPI(RetryOnLockMixin, ChangeLogMixin, CachedResponseMixin, ValuesListMixin, ConditionalMixin,
+               SparseQuerysetMixin, BatchMixin, BulkCreateMixin, ExportMixin, viewsets.ModelViewSet):
     """
     retrieve:
-        Return a quote instance.
+        Return a quote instance. Use `fields` to return only some of the fields, e.g. `fields=id,message`,
+        and `expand=author` to embed the author instead of their id.
 
     list:
-        Return all quotes.
+        Return quotes one page at a time, ordered by id. Follow the `next` and `previous` cursors to move
+        between pages and use `page_size` to change the number of quotes per page. With `search`, return
+        only quotes whose message contains all the given words, best matches first, paged with `page`.
+        Accepts `fields` and `expand=author` like retrieve.
 
     create:
         Create a new quote.
@@ -47,18 +109,75 @@ class QuoteAPI(viewsets.ModelViewSet):
 
     update:
         Update a quote.
+
+    export:
+        Stream all quotes as newline-delimited JSON, one quote per line. Accepts the `author`, `id__gt` and
+        `id__lt` filters.
+
+    bulk:
+        Create many quotes at once from a JSON array or an NDJSON (`application/x-ndjson`) body. Valid quotes
+        are saved in one transaction and invalid ones are reported by their index. With `upsert=true`, a quote
+        whose author and message already exist is matched instead of duplicated.
+
+    random:
+        Return one quote picked uniformly at random, optionally only among the quotes of `author`.
+
+    batch:
+        Return the quotes with the given `ids` (comma separated, at most 100) in the same order. Ids that
+        don't exist are listed under `missing`.
     """
     queryset = Quote.objects.all()
     serializer_class = QuoteSerializer
+    filter_backends = [QuoteSearchFilter]
+    throttle_scopes = {'write': 'quotes-write'}
+    export_filters = ('author', 'id__gt', 'id__lt')
+    bulk_natural_key = ('author', 'message')
+    change_resource = 'quote'
+    change_related = {'author': ('author', AuthorSerializer)}
+    expand_namespaces = {'author': 'authors'}
+
+    def get_cache_namespaces(self):
+        if self.action == 'retrieve':
+            return ['quote:' + self.get_cache_pk('pk')]
+        return ['quotes']
 
+    @action(detail=False, methods=['get'])
+    def random(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        author = request.query_params.get('author')
+        if author is not None:
+            try:
+                author = to_python_in_range(queryset.model._meta.get_field('author'), author, queryset.db)
+            except ValueError:
+                raise ValidationError({'author': ['A valid integer is required.']})
+            queryset = queryset.filter(author=author)
+        instance = random_row(queryset)
+        if instance is None:
+            raise NotFound()
+        return Response(self.get_serializer(instance).data, headers={'Cache-Control': 'no-store'})
 
-class AuthorQuoteAPI(viewsets.ModelViewSet):
+    def bulk_written(self, items):
+        counts = Counter(item['author'].pk for item in items if item.get('author') is not None)
+        Author.objects.adjust_quote_counts(counts)
+        response_cache.invalidate('quotes', 'authors', *['author:{}:quotes'.format(pk) for pk in counts],
+                                  *['author:{}'.format(pk) for pk in counts])
+
+    @property
+    def paginator(self):
+        if self.request is not None and QuoteSearchFilter().get_search_terms(self.request):
+            self.pagination_class = SearchPagination
+        return super().paginator
+
+
+class AuthorQuoteAPI(RetryOnLockMixin, ChangeLogMixin, CachedResponseMixin, ConditionalMixin, SparseQuerysetMixin,
+                     viewsets.ModelViewSet):
     """
     retrieve:
         Return a quote instance for a specific author.
 
     list:
-        Return all quotes for a specific author..
+        Return the quotes of a specific author one page at a time, ordered by id. Accepts `fields` and
+        `expand=author`.
 
     create:
         Create a new quote for a specific author.
@@ -72,7 +191,75 @@ class AuthorQuoteAPI(viewsets.ModelViewSet):
     update:
         Update a quote for a specific author.
     """
+    queryset = Quote.objects.order_by('id')
     serializer_class = QuoteSerializer
+    throttle_scopes = {'read': 'author-quotes-read'}
+    change_resource = 'quote'
+    change_related = {'author': ('author', AuthorSerializer)}
+    expand_namespaces = {'author': 'authors'}
+
+    def get_cache_namespaces(self):
+        namespaces = ['author:{}:quotes'.format(self.get_cache_pk('author_pk'))]
+        if self.action == 'retrieve':
+            namespaces.append('quote:' + self.get_cache_pk('pk'))
+        return namespaces
 
     def get_queryset(self):
-        return Quote.objects.filter(author=self.kwargs['author_pk'])
+        if getattr(self, 'swagger_fake_view', False):
+            return Quote.objects.none()
+        return super().get_queryset().filter(author=self.kwargs['author_pk'])
+
+
+class ChangeAPI(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    list:
+        Return the changes made to quotes and authors after the sequence number `since`, oldest first. Each
+        change names the `resource`, the `object_id` and the `action` (`created`, `updated` or `deleted`) and
+        carries the row as it was after the write in `data`. Send the returned `last` as `since` next time to
+        get only what changed in between; `next` is set when more changes are already waiting. Use `resource`
+        to follow only `quote` or `author` changes.
+
+    stream:
+        Stream the changes as server-sent events: `id` is the sequence number, `event` the action and `data`
+        the change. Starts after `since` or the `Last-Event-ID` header, or with the next change when neither
+        is given. Accepts `resource` like list. Meant to be served through `novi_lab1.asgi`.
+    """
+    queryset = Change.objects.all()
+    serializer_class = ChangeSerializer
+    pagination_class = SincePagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        resource = self.request.query_params.get('resource') if self.request is not None else None
+        if resource is not None:
+            if resource not in dict(Change.RESOURCES):
+                raise ValidationError({'resource': ['Choose one of: {}.'.format(
+                    ', '.join(name for name, _ in Change.RESOURCES))]})
+            queryset = queryset.filter(resource=resource)
+        return queryset
+
+    def fetch_events(self, since):
+        rows = self.get_queryset().filter(pk__gt=since).order_by('pk')[:self.paginator.page_size]
+        return [(change['seq'], change['action'], change) for change in self.get_serializer(rows, many=True).data]
+
+    @action(detail=False, methods=['get'],
+            renderer_classes=[EventStreamRenderer, *api_settings.DEFAULT_RENDERER_CLASSES])
+    def stream(self, request, *args, **kwargs):
+        since = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('since')
+        if since is None:
+            since = self.get_queryset().aggregate(last=Max('pk'))['last'] or 0
+        events = EventStream(self.fetch_events, SincePagination.parse_since(since),
+                             poll_interval=settings.CHANGE_STREAM_POLL_INTERVAL,
+                             keepalive=settings.CHANGE_STREAM_KEEPALIVE, timeout=settings.CHANGE_STREAM_TIMEOUT)
+        return EventStreamResponse(events)
+
+
+class RevokeTokenAPI(APIView):
+    """
+    post:
+        Revoke the API token of the current user. A new one can be obtained from `/api-token-auth/`.
+    """
+
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'novi_lab1.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# same as get_asgi_application(), with server-sent events streamed without blocking the event loop
+from myApp.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,12 +39,15 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'myApp',
     'rest_framework_swagger',
     'drf_yasg'
 ]
 
 MIDDLEWARE = [
+    'myApp.middleware.TimingMiddleware',
+    'myApp.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,11 +60,47 @@ MIDDLEWARE = [
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
     'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework.authentication.SessionAuthentication',
-                                       'rest_framework.authentication.BasicAuthentication'],
+                                       'myApp.authentication.CachedTokenAuthentication'],
+    # orjson-backed JSON first; MessagePack only when the msgpack package is installed
+    'DEFAULT_RENDERER_CLASSES': ['myApp.renderers.FastJSONRenderer',
+                                 *(['myApp.renderers.MessagePackRenderer'] if find_spec('msgpack') else []),
+                                 'rest_framework.renderers.BrowsableAPIRenderer'],
+    'DEFAULT_PARSER_CLASSES': ['myApp.parsers.FastJSONParser',
+                               *(['myApp.parsers.MessagePackParser'] if find_spec('msgpack') else []),
+                               'rest_framework.parsers.FormParser',
+                               'rest_framework.parsers.MultiPartParser'],
+    'DEFAULT_PAGINATION_CLASS': 'myApp.pagination.IdCursorPagination',
+    'PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'DEFAULT_THROTTLE_CLASSES': ['myApp.throttling.UserSlidingThrottle',
+                                 'myApp.throttling.ScopedSlidingThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '1200/minute',
+        'quotes-write': '300/minute',
+        'author-quotes-read': '600/minute',
+    },
+}
+
+SWAGGER_SETTINGS = {
+    'SECURITY_DEFINITIONS': {'Token': {'type': 'apiKey', 'name': 'Authorization', 'in': 'header'}},
 }
 
+# Verified API tokens are cached in each process for this many seconds
+TOKEN_CACHE_TTL = 300
+TOKEN_CACHE_MAX_SIZE = 10000
+
 ROOT_URLCONF = 'novi_lab1.urls'
 
+# Requests slower than this are logged by myApp.middleware.TimingMiddleware; None turns the log off
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# Addresses that may read /metrics without logging in; everyone else needs a staff account. Behind a reverse
+# proxy on the same host every request comes from 127.0.0.1, so the list is empty by default.
+METRICS_ALLOWED_IPS = []
+
+# Pre-generated OpenAPI schema, see `manage.py generate_schema`
+OPENAPI_SCHEMA_PATH = BASE_DIR / 'openapi.json'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -88,9 +128,72 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Applied to every new SQLite connection, see myApp.db.configure_sqlite
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+}
+
+# How many times the myApp write endpoints retry after "database is locked"
+DATABASE_LOCK_RETRIES = 3
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'compressed': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'compressed',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    # must be shared by all worker processes (e.g. Redis or Memcached) for the rate limits to hold across them
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'throttle',
+    },
+}
+
+# Serialized list/detail responses of the myApp viewsets, see myApp.cache
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Responses of at least COMPRESSION_MIN_SIZE bytes are compressed by myApp.middleware.CompressionMiddleware,
+# which keeps the compressed bodies in this cache
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CACHE_ALIAS = 'compressed'
+COMPRESSION_CACHE_TIMEOUT = 3600
+
+# Request counters of the throttles in myApp.throttling
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+# Author.cached_quote_count is always kept up to date; this picks whether author lists read it
+# instead of counting quotes with an aggregate query
+AUTHOR_QUOTE_COUNT_DENORMALIZED = False
+
+# Views with ValuesListMixin build list pages from .values() rows instead of running the serializer per row
+LIST_FROM_VALUES = True
+
+# Server-sent events at /api/changes/stream/: how often new changes are looked up, how long an idle stream
+# waits before sending a keep-alive comment and how long a stream lasts before the client has to reconnect
+CHANGE_STREAM_POLL_INTERVAL = 1
+CHANGE_STREAM_KEEPALIVE = 15
+CHANGE_STREAM_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
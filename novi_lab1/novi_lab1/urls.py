@@ -19,26 +19,40 @@ from rest_framework import permissions
 from django.urls import path, include
 from django.contrib import admin
 from drf_yasg import openapi
+from rest_framework.authtoken.views import obtain_auth_token
 
-schema_view = get_schema_view(
-   openapi.Info(
-      title="APUW Documentation",
-      default_version='v1',
-      description="Test description",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
+from myApp.compression import keep_compressed
+from myApp.metrics import metrics_view
+from myApp.views import RevokeTokenAPI
+from myApp.schema import SchemaArtifact, cached_schema_view
+
+schema_info = openapi.Info(
+   title="APUW Documentation",
+   default_version='v1',
+   description="Test description",
+   terms_of_service="https://www.google.com/policies/terms/",
+   contact=openapi.Contact(email="contact@snippets.local"),
+   license=openapi.License(name="BSD License"),
+)
+
+schema_artifact = SchemaArtifact(schema_info)
+
+schema_view = cached_schema_view(get_schema_view(
+   schema_info,
    public=True,
    permission_classes=(permissions.AllowAny,),
-)
+), schema_artifact)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('myApp.urls')),
     path('api-auth/', include('rest_framework.urls')),
-    path('docs/', TemplateView.as_view(
+    path('api-token-auth/', obtain_auth_token),
+    path('api-token-auth/revoke/', RevokeTokenAPI.as_view()),
+    path('docs/', keep_compressed(TemplateView.as_view(
         template_name='documentation.html',
-        extra_context={'schema_url': 'openapi-schema'})),
+        extra_context={'schema_url': 'openapi-schema'}))),
+    path('metrics', metrics_view, name='metrics'),
+    path('openapi/', schema_view.without_ui(cache_timeout=0), name='openapi-schema'),
     path('', schema_view.with_ui('swagger', cache_timeout=0), name='documentation')
 ]